@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Server-side barcode decoding: OpenCV/NumPy preprocessing, pyzbar decoding
+Falls back to OpenCV's own QR/EAN/UPC detectors when zbar is not installed
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+try:
+    from pyzbar import pyzbar
+except ImportError:  # pyzbar itself or the zbar shared library is missing
+    pyzbar = None
+
+# OpenCV symbology names -> the names pyzbar reports
+_OPENCV_TYPES = {
+    'EAN_13': 'EAN13',
+    'EAN_8': 'EAN8',
+    'UPC_A': 'UPCA',
+    'UPC_E': 'UPCE',
+}
+
+# 'full' decodes the whole frame; 'regions' localizes candidate symbols on a
+# downscaled copy first and decodes each crop, which finds small codes in large
+# warehouse shots that a single full-frame pass misses
+DECODE_MODES = ('full', 'regions')
+
+LOCALIZE_MAX_SIDE = 1024
+# Candidates thinner than this (full-resolution pixels) or more elongated than
+# MAX_REGION_ASPECT are text lines and shelf edges, not symbols
+MIN_REGION_SIDE = 48
+MAX_REGION_ASPECT = 4.0
+REGION_PADDING = 0.1
+# Tried in order per region until one finds something
+PYRAMID_SCALES = (1.0, 2.0, 0.5)
+MAX_REGIONS = int(os.environ.get('DECODE_MAX_REGIONS', 64))
+REGION_THREADS = int(os.environ.get('DECODE_REGION_THREADS', os.cpu_count() or 1))
+
+_region_executor = None
+_region_executor_pid = None
+
+
+def decoder_backend():
+    """Name of the decoder in use: 'pyzbar' or 'opencv'"""
+    return 'pyzbar' if pyzbar is not None else 'opencv'
+
+
+def load_grayscale(image_bytes):
+    """Decode an uploaded image (PNG, JPEG, WebP, ...) to a grayscale array"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError("Unsupported or corrupt image")
+    return image
+
+
+def preprocess_passes(gray):
+    """Yield progressively stronger binarizations of a grayscale image
+
+    Most clean labels decode from the raw grayscale; Otsu helps with uneven
+    exposure and the adaptive threshold with shadows and glare.
+    """
+    yield gray
+    _, otsu = cv2.threshold(cv2.GaussianBlur(gray, (3, 3), 0), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    yield otsu
+    yield cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+
+def _symbol(symbology, data, polygon):
+    polygon = [[int(x), int(y)] for x, y in polygon]
+    left, top, width, height = cv2.boundingRect(np.array(polygon, dtype=np.int32)) if polygon else (0, 0, 0, 0)
+    if isinstance(data, bytes):
+        data = data.decode('utf-8', errors='replace')
+    return {
+        'type': symbology,
+        'data': data,
+        'rect': {'left': left, 'top': top, 'width': width, 'height': height},
+        'polygon': polygon,
+    }
+
+
+def _decode_pyzbar(image):
+    return [_symbol(found.type, found.data, [(point.x, point.y) for point in found.polygon])
+            for found in pyzbar.decode(image)]
+
+
+def _decode_opencv(image):
+    symbols = []
+    # The ArUco-based detector finds finder patterns several times faster
+    detector = cv2.QRCodeDetectorAruco() if hasattr(cv2, 'QRCodeDetectorAruco') else cv2.QRCodeDetector()
+    ok, texts, points, _ = detector.detectAndDecodeMulti(image)
+    if ok:
+        symbols += [_symbol('QRCODE', text, corners) for text, corners in zip(texts, points) if text]
+    if hasattr(cv2, 'barcode'):
+        ok, texts, types, points = cv2.barcode.BarcodeDetector().detectAndDecodeWithType(image)
+        if ok:
+            symbols += [_symbol(_OPENCV_TYPES.get(kind, kind), text, corners)
+                        for text, kind, corners in zip(texts, types, points) if text]
+    return symbols
+
+
+def decode_array(gray):
+    """Decode every symbol in a grayscale array, stopping at the first pass that finds any"""
+    decode = _decode_pyzbar if pyzbar is not None else _decode_opencv
+    for image in preprocess_passes(gray):
+        symbols = decode(image)
+        if symbols:
+            return symbols
+    return []
+
+
+def find_candidate_regions(gray, max_regions=MAX_REGIONS):
+    """Bounding boxes (left, top, width, height) of likely symbols, largest first
+
+    Bars and QR modules are dense, high-contrast edges: threshold the blurred
+    gradient magnitude of a downscaled copy, close the gaps between bars and
+    modules, and erode away isolated text strokes.
+    """
+    height, width = gray.shape
+    scale = min(1.0, LOCALIZE_MAX_SIDE / max(height, width))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+
+    gradient_x = cv2.Sobel(small, cv2.CV_32F, 1, 0, ksize=cv2.FILTER_SCHARR)
+    gradient_y = cv2.Sobel(small, cv2.CV_32F, 0, 1, ksize=cv2.FILTER_SCHARR)
+    gradient = cv2.blur(cv2.convertScaleAbs(cv2.magnitude(gradient_x, gradient_y), alpha=0.25), (5, 5))
+    _, mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 9)))
+    mask = cv2.dilate(cv2.erode(mask, None, iterations=3), None, iterations=3)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    regions = []
+    for contour in contours:
+        x, y, w, h = (value / scale for value in cv2.boundingRect(contour))
+        if min(w, h) < MIN_REGION_SIDE or max(w, h) > MAX_REGION_ASPECT * min(w, h):
+            continue
+        pad = REGION_PADDING * max(w, h) + 8
+        left, top = max(0, int(x - pad)), max(0, int(y - pad))
+        right, bottom = min(width, int(x + w + pad)), min(height, int(y + h + pad))
+        regions.append((left, top, right - left, bottom - top))
+    regions.sort(key=lambda region: region[2] * region[3], reverse=True)
+    return regions[:max_regions]
+
+
+def _offset_symbol(symbol, scale, left, top):
+    """Map a symbol found in a scaled crop back to full-image coordinates"""
+    polygon = [(x / scale + left, y / scale + top) for x, y in symbol['polygon']]
+    return _symbol(symbol['type'], symbol['data'], polygon)
+
+
+def decode_region(gray, region, scales=PYRAMID_SCALES):
+    """Decode one candidate region, trying each pyramid scale until one finds something"""
+    left, top, width, height = region
+    crop = gray[top:top + height, left:left + width]
+    for scale in scales:
+        if scale == 1.0:
+            image = crop
+        elif min(width, height) * scale < MIN_REGION_SIDE:
+            continue
+        else:
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            image = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=interpolation)
+        symbols = decode_array(image)
+        if symbols:
+            return [_offset_symbol(symbol, scale, left, top) for symbol in symbols]
+    return []
+
+
+def _overlaps(a, b):
+    return (a['left'] < b['left'] + b['width'] and b['left'] < a['left'] + a['width']
+            and a['top'] < b['top'] + b['height'] and b['top'] < a['top'] + a['height'])
+
+
+def dedupe_symbols(symbols):
+    """Drop repeat reads of the same symbol from overlapping regions
+
+    Equal data at separate positions (two labels for one product) is kept.
+    """
+    unique = []
+    for symbol in symbols:
+        if not any(symbol['type'] == seen['type'] and symbol['data'] == seen['data']
+                   and _overlaps(symbol['rect'], seen['rect']) for seen in unique):
+            unique.append(symbol)
+    return unique
+
+
+def get_region_executor():
+    """Thread pool for region decoding; OpenCV and zbar release the GIL
+
+    Threads do not survive a fork, so batch pool workers build their own.
+    """
+    global _region_executor, _region_executor_pid
+    if _region_executor is None or _region_executor_pid != os.getpid():
+        _region_executor = ThreadPoolExecutor(max_workers=REGION_THREADS)
+        _region_executor_pid = os.getpid()
+    return _region_executor
+
+
+def decode_regions(gray):
+    """Localize candidate regions and decode them in parallel
+
+    Falls back to a full-frame pass when no region yields a symbol.
+    """
+    regions = find_candidate_regions(gray)
+    if REGION_THREADS > 1 and len(regions) > 1:
+        found = get_region_executor().map(lambda region: decode_region(gray, region), regions)
+    else:
+        found = (decode_region(gray, region) for region in regions)
+    symbols = dedupe_symbols([symbol for symbols in found for symbol in symbols])
+    return symbols or decode_array(gray)
+
+
+def decode_image_bytes(image_bytes, mode='full'):
+    """Decode one uploaded image; safe to run in a worker process
+
+    Returns {'barcodes': [...], 'width', 'height', 'seconds'} or {'error': ...}.
+    """
+    start = time.perf_counter()
+    try:
+        gray = load_grayscale(image_bytes)
+        barcodes = decode_regions(gray) if mode == 'regions' else decode_array(gray)
+    except Exception as e:
+        return {'error': str(e), 'seconds': time.perf_counter() - start}
+    return {
+        'barcodes': barcodes,
+        'width': int(gray.shape[1]),
+        'height': int(gray.shape[0]),
+        'seconds': time.perf_counter() - start,
+    }
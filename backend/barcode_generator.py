@@ -1,68 +1,275 @@
-import sqlite3
 import qrcode
+import qrcode.image.svg
 import barcode
-from barcode.writer import ImageWriter
-from flask import Flask, request, jsonify, send_file
+from barcode.writer import ImageWriter, SVGWriter
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 import os
 import json
 from datetime import datetime
 import io
+import base64
+import time
+import threading
+from functools import partial
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from PIL import Image
+from log_config import configure_logging
+from render_cache import create_render_cache
+from image_store import create_image_store
+from id_generator import create_id_generator
+from raster_profiles import RASTER_PROFILES, encode_image
+from qr_raster import rasterize_qr
+import linear_barcodes
+from qr_payload import PAYLOAD_MODES, decode_payload, encode_fields, fit_version
+from metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE
+from db_pool import create_connection_pool
+from job_queue import create_job_queue, ensure_jobs_table
+from scan_index import create_scan_index
+from database_manager import EXPORT_FORMATS, iter_export_chunks, gzip_chunks
+from search_index import ensure_search_index, search_barcodes
+from spatial_index import ensure_spatial_index, find_within, find_nearest
+from barcode_decoder import DECODE_MODES, decode_image_bytes, decoder_backend
+from stream_scanner import ScanSession, iter_frames
 
 app = Flask(__name__)
-CORS(app, origins="*")
+# response=image returns the record in headers, which browsers hide cross-origin unless exposed
+CORS(app, origins="*", expose_headers=['X-Barcode-Id', 'X-QR-Version', 'X-Barcode-Filename'])
+
+# Level comes from LOG_LEVEL; records are written off the request thread
+logger = configure_logging()
 
 # Database configuration for Render.com
 DATABASE_PATH = os.environ.get('DATABASE_URL', 'barcodes.db')
+db_pool = create_connection_pool(DATABASE_PATH)
 BARCODES_DIR = os.path.join(os.path.dirname(__file__), 'barcodes')
 
 # Ensure barcodes directory exists
 os.makedirs(BARCODES_DIR, exist_ok=True)
 
+# Rendered images keyed by (type, data, render params)
+render_cache = create_render_cache(BARCODES_DIR)
+
+# Generated images, keyed by filename: one file each, or pack segments (IMAGE_STORE)
+image_store = create_image_store(BARCODES_DIR)
+
+# Time-sortable unique ids shared by barcode_id and the image filename
+id_generator = create_id_generator()
+
+# Bulk generation settings
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 5000))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_PARALLEL_THRESHOLD = int(os.environ.get('BATCH_PARALLEL_THRESHOLD', 8))
+_batch_pool = None
+
+# /decode settings; image batches share the bulk process pool
+DECODE_MAX_IMAGES = int(os.environ.get('DECODE_MAX_IMAGES', 100))
+DECODE_PARALLEL_THRESHOLD = int(os.environ.get('DECODE_PARALLEL_THRESHOLD', 2))
+
+# Background jobs share the barcodes database; progress is saved every chunk
+job_queue = create_job_queue(db_pool)
+JOB_PROGRESS_CHUNK = int(os.environ.get('JOB_PROGRESS_CHUNK', 500))
+
+# barcode_id / barcode_data -> row id for /resolve, synced after every insert
+scan_index = create_scan_index()
+RESOLVE_MAX_CODES = int(os.environ.get('RESOLVE_MAX_CODES', 1000))
+
+# Output formats: name -> (file extension, mimetype)
+IMAGE_FORMATS = {
+    'png': ('png', 'image/png'),
+    'svg': ('svg', 'image/svg+xml'),
+    'webp': ('webp', 'image/webp'),
+}
+DEFAULT_IMAGE_FORMAT = 'png'
+
+# Server-wide raster profile (see raster_profiles.py); requests may pick another
+RASTER_PROFILE = os.environ.get('RASTER_PROFILE', 'png')
+if RASTER_PROFILE not in RASTER_PROFILES:
+    raise ValueError(f"RASTER_PROFILE must be one of {', '.join(RASTER_PROFILES)}")
+
+# QR defaults; requests may override each within the validated ranges below
+QR_ERROR_CORRECTION_LEVELS = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+QR_ERROR_CORRECTION = os.environ.get('QR_ERROR_CORRECTION', 'L').upper()
+if QR_ERROR_CORRECTION not in QR_ERROR_CORRECTION_LEVELS:
+    raise ValueError(f"QR_ERROR_CORRECTION must be one of {', '.join(QR_ERROR_CORRECTION_LEVELS)}")
+QR_BOX_SIZE = int(os.environ.get('QR_BOX_SIZE', 10))
+QR_BORDER = int(os.environ.get('QR_BORDER', 4))
+QR_MAX_BOX_SIZE = int(os.environ.get('QR_MAX_BOX_SIZE', 50))
+QR_MAX_BORDER = 20
+
+# Default QR payload encoding for metadata-bearing codes (see qr_payload.py)
+QR_PAYLOAD_MODE = os.environ.get('QR_PAYLOAD_MODE', 'json')
+if QR_PAYLOAD_MODE not in PAYLOAD_MODES:
+    raise ValueError(f"QR_PAYLOAD_MODE must be one of {', '.join(PAYLOAD_MODES)}")
+EXTENSION_MIMETYPES = {extension: mimetype for extension, mimetype in IMAGE_FORMATS.values()}
+
+# /get_barcode caching: a generated image never changes, so clients may keep it
+BARCODE_CACHE_MAX_AGE = int(os.environ.get('BARCODE_CACHE_MAX_AGE', 365 * 24 * 3600))
+# Hand the file to a front server instead of streaming it from Python:
+# 'x-sendfile' (Apache, lighttpd) or 'x-accel-redirect' (nginx, internal
+# location at BARCODE_ACCEL_PREFIX aliased to BARCODES_DIR)
+SENDFILE_MODES = ('', 'x-sendfile', 'x-accel-redirect')
+BARCODE_SENDFILE = os.environ.get('BARCODE_SENDFILE', '').lower()
+if BARCODE_SENDFILE not in SENDFILE_MODES:
+    raise ValueError("BARCODE_SENDFILE must be x-sendfile or x-accel-redirect")
+BARCODE_ACCEL_PREFIX = os.environ.get('BARCODE_ACCEL_PREFIX', '/internal/barcodes/')
+if BARCODE_SENDFILE and image_store.name != 'filesystem':
+    logger.warning("BARCODE_SENDFILE is ignored with the %s image store", image_store.name)
+
+# In-memory render mode: how the image is returned and whether it is written to disk
+RESPONSE_MODES = ('json', 'image', 'base64')
+PERSIST_MODES = ('sync', 'deferred', 'none')
+DEFERRED_WRITE_WORKERS = int(os.environ.get('DEFERRED_WRITE_WORKERS', 2))
+_deferred_writer = None
+_deferred_writer_pid = None
+
+# Per-process metrics exposed at /metrics
+STAGE_LATENCY = REGISTRY.histogram(
+    'barcode_stage_duration_seconds', 'Latency of barcode pipeline stages', ('stage', 'type'))
+REQUEST_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by endpoint', ('endpoint', 'method', 'status'))
+BARCODES_GENERATED = REGISTRY.counter(
+    'barcodes_generated_total', 'Barcodes generated and saved', ('type', 'source'))
+GENERATION_ERRORS = REGISTRY.counter(
+    'barcode_generation_errors_total', 'Barcode generation failures', ('type', 'source'))
+BARCODES_DECODED = REGISTRY.counter(
+    'barcodes_decoded_total', 'Symbols found by /decode', ('type',))
+QR_VERSIONS = REGISTRY.histogram(
+    'barcode_qr_version', 'QR version of generated codes by payload mode', ('payload',),
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 40))
+
+# type and source come straight from requests (unknown types fall back to Code128),
+# so labels are mapped onto a fixed set to keep clients from minting new series
+METRIC_TYPES = frozenset(['qr', *barcode.PROVIDED_BARCODES, *linear_barcodes.SYMBOLOGIES])
+METRIC_SOURCES = frozenset(['web', 'mobile'])
+
+def type_label(barcode_type):
+    """Metric label for a requested symbology: known names, else 'other'"""
+    barcode_type = str(barcode_type).lower()
+    return barcode_type if barcode_type in METRIC_TYPES else 'other'
+
+def source_label(source):
+    """Metric label for a request source: known sources, else 'other'"""
+    source = str(source).lower()
+    return source if source in METRIC_SOURCES else 'other'
+
+for _name in ('memory_hits', 'disk_hits', 'misses', 'evictions', 'disk_evictions'):
+    REGISTRY.register_callback(
+        f'barcode_render_cache_{_name}_total', f'Render cache {_name.replace("_", " ")}',
+        lambda _name=_name: render_cache.stats()[_name], kind='counter')
+for _name in ('resolved', 'rejected', 'misses'):
+    REGISTRY.register_callback(
+        f'barcode_scan_index_{_name}_total', f'Scan index lookups {_name}',
+        lambda _name=_name: scan_index.stats()[_name], kind='counter')
+REGISTRY.register_callback(
+    'barcode_render_cache_memory_bytes', 'Bytes held in the render cache memory tier',
+    lambda: render_cache.stats()['memory_bytes'])
+
+# /search result cap
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 100))
+
+# /locations result caps
+LOCATION_MAX_RESULTS = int(os.environ.get('LOCATION_MAX_RESULTS', 1000))
+NEAREST_MAX_K = int(os.environ.get('NEAREST_MAX_K', 100))
+
+# /list_barcodes paging
+LIST_DEFAULT_PAGE_SIZE = int(os.environ.get('LIST_DEFAULT_PAGE_SIZE', 50))
+LIST_MAX_PAGE_SIZE = int(os.environ.get('LIST_MAX_PAGE_SIZE', 500))
+
+BARCODE_COLUMNS = '''id, barcode_id, barcode_data, barcode_type, source, created_at, file_path, metadata,
+                   product_name, product_id, price, location_x, location_y, location_z, category'''
+
 # Database setup
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def ensure_schema():
+    """Create any missing tables, indexes and triggers, once per process
+    
+    Every statement is idempotent, so databases created by older versions are
+    upgraded in place whichever entry point (gunicorn, app.py, wsgi.py) runs.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn = db_pool.connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS barcodes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                barcode_id TEXT UNIQUE NOT NULL,
+                barcode_data TEXT NOT NULL,
+                barcode_type TEXT NOT NULL,
+                source TEXT NOT NULL,
+                product_name TEXT,
+                product_id TEXT,
+                price REAL,
+                location_x REAL,
+                location_y REAL,
+                location_z REAL,
+                category TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                file_path TEXT,
+                metadata TEXT
+            )
+        ''')
+        
+        # Keyset pagination walks (created_at, id); filters lead with their column
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_created_at_id ON barcodes(created_at, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_type_created_at ON barcodes(barcode_type, created_at, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_source_created_at ON barcodes(source, created_at, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_category_created_at ON barcodes(category, created_at, id)')
+        # Scanned metadata QR payloads resolve through their product_id
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_product_id_created_at ON barcodes(product_id, created_at, id)')
+        conn.commit()
+        
+        # Full-text index for /search (no-op if SQLite lacks FTS5)
+        ensure_search_index(conn)
+        
+        # R*Tree over location_x/y/z for /locations queries
+        ensure_spatial_index(conn)
+        
+        # Background jobs (async /generate_barcodes)
+        ensure_jobs_table(conn)
+        
+        # Load every existing row into the /resolve index
+        scan_index.sync(conn)
+        _schema_ready = True
+
 def init_database():
     """Initialize SQLite database with barcode table"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS barcodes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            barcode_id TEXT UNIQUE NOT NULL,
-            barcode_data TEXT NOT NULL,
-            barcode_type TEXT NOT NULL,
-            source TEXT NOT NULL,
-            product_name TEXT,
-            product_id TEXT,
-            price REAL,
-            location_x REAL,
-            location_y REAL,
-            location_z REAL,
-            category TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            file_path TEXT,
-            metadata TEXT
-        )
-    ''')
+    ensure_schema()
     
-    conn.commit()
-    conn.close()
+    # Resume any background jobs left from a restart
+    job_queue.start()
 
-def generate_barcode_id(barcode_type, product_id):
-    """Generate unique barcode ID"""
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_suffix = ''.join([str(ord(c) % 10) for c in product_id[:3]]) if product_id else '000'
-    return f"{barcode_type.upper()}_{timestamp}_{random_suffix}"
+def generate_barcode_id(barcode_type, uid=None):
+    """Generate unique barcode ID: the type plus a time-sortable id"""
+    return f"{barcode_type.upper()}_{uid or id_generator.new_id()}"
 
-def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path, metadata=None):
-    """Save barcode information to database"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Debug logging
-    print(f"DEBUG: metadata type: {type(metadata)}")
-    print(f"DEBUG: metadata content: {metadata}")
+INSERT_BARCODE_SQL = '''
+    INSERT INTO barcodes (
+        barcode_id, barcode_data, barcode_type, source, file_path, metadata,
+        product_name, product_id, price, location_x, location_y, location_z, category
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+# Retried jobs re-save rows they may already have written
+INSERT_BARCODE_IGNORE_SQL = INSERT_BARCODE_SQL.replace('INSERT INTO', 'INSERT OR IGNORE INTO', 1)
+
+def build_barcode_row(barcode_id, barcode_data, barcode_type, source, file_path, metadata=None):
+    """Build the INSERT_BARCODE_SQL parameter tuple for one barcode"""
+    logger.debug("Building row for %s, metadata: %r", barcode_id, metadata)
     
     # Extract location and product info from metadata
     product_name = metadata.get('product_name') if metadata else None
@@ -75,9 +282,6 @@ def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path
     location_y = None
     location_z = None
     
-    print(f"DEBUG: location_str type: {type(location_str)}")
-    print(f"DEBUG: location_str content: {location_str}")
-    
     if location_str:
         if isinstance(location_str, str):
             # Parse location string like "12.3,12,60" or "Warehouse A"
@@ -91,12 +295,12 @@ def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path
                         location_y = float(coords[1].strip())
                     if len(coords) >= 3:
                         location_z = float(coords[2].strip())
-                    print(f"DEBUG: Parsed coordinates - x:{location_x}, y:{location_y}, z:{location_z}")
+                    logger.debug("Parsed coordinates - x:%s, y:%s, z:%s", location_x, location_y, location_z)
                 else:
                     # It's a location name, not coordinates
-                    print(f"DEBUG: Location is a name: {location_str}")
+                    logger.debug("Location is a name: %s", location_str)
             except (ValueError, IndexError) as e:
-                print(f"DEBUG: Error parsing location: {e}")
+                logger.debug("Error parsing location %r: %s", location_str, e)
                 # Don't fail, just continue with None values
                 pass
         elif isinstance(location_str, dict):
@@ -104,102 +308,351 @@ def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path
             location_x = location_str.get('x')
             location_y = location_str.get('y')
             location_z = location_str.get('z')
-            print(f"DEBUG: Location is a dict - x:{location_x}, y:{location_y}, z:{location_z}")
+            logger.debug("Location is a dict - x:%s, y:%s, z:%s", location_x, location_y, location_z)
         else:
-            print(f"DEBUG: Unknown location type: {type(location_str)}")
+            logger.debug("Unknown location type: %s", type(location_str))
     
     category = metadata.get('category') if metadata else None
     
-    cursor.execute('''
-        INSERT INTO barcodes (
-            barcode_id, barcode_data, barcode_type, source, file_path, metadata,
-            product_name, product_id, price, location_x, location_y, location_z, category
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+    return (
         barcode_id, barcode_data, barcode_type, source, file_path, 
         json.dumps(metadata) if metadata else None,
         product_name, product_id, price, location_x, location_y, location_z, category
-    ))
+    )
+
+def save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, file_path, metadata=None):
+    """Save barcode information to database"""
+    row = build_barcode_row(barcode_id, barcode_data, barcode_type, source, file_path, metadata)
     
-    conn.commit()
-    conn.close()
+    with STAGE_LATENCY.time(stage='db_insert', type=type_label(barcode_type)):
+        with db_pool.transaction() as conn:
+            conn.execute(INSERT_BARCODE_SQL, row)
+    scan_index.sync(conn)
 
-def generate_qr_code(data, filename):
-    """Generate QR code"""
-    print(f"DEBUG: Generating QR code with data: '{data}'")
-    print(f"DEBUG: Data type: {type(data)}")
-    print(f"DEBUG: Data length: {len(data) if data else 0}")
-    print(f"DEBUG: Filename: {filename}")
+def save_barcodes_to_db(rows, ignore_existing=False):
+    """Save many barcode rows in a single transaction
+
+    ignore_existing skips rows whose barcode_id is already stored, so a
+    retried job can re-save its batch.
+    """
+    sql = INSERT_BARCODE_IGNORE_SQL if ignore_existing else INSERT_BARCODE_SQL
+    with STAGE_LATENCY.time(stage='db_insert_batch', type='batch'):
+        with db_pool.transaction() as conn:
+            conn.executemany(sql, rows)
+    scan_index.sync(conn)
+
+def timed_render(barcode_type, render):
+    """Wrap a render callable so cache misses are recorded as the encode stage"""
+    def timed():
+        with STAGE_LATENCY.time(stage='encode', type=type_label(barcode_type)):
+            return render()
+    return timed
+
+def parse_render_options(data):
+    """Validate per-request render options into the dict used for rendering and cache keys"""
+    image_format = data.get('format') or request.args.get('format')
+    if not image_format:
+        # An Accept header asking for SVG selects it when no format is given
+        best = request.accept_mimetypes.best_match(['application/json', 'image/png', 'image/svg+xml'])
+        image_format = 'svg' if best == 'image/svg+xml' else None
+    image_format = str(image_format).lower() if image_format else None
+    if image_format is not None and image_format not in IMAGE_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(IMAGE_FORMATS)}")
+    text = data.get('text', request.args.get('text', True))
+    if isinstance(text, str):
+        text = text.lower() not in ('0', 'false', 'no')
+    if image_format == 'svg':
+        options = {'format': 'svg', 'text': bool(text)}
+    else:
+        options = parse_raster_profile(data, image_format)
+        options['text'] = bool(text)
+
+    if str(data.get('type', 'qr')).lower() == 'qr':
+        options.update(parse_qr_options(data))
+        payload_mode = str(data.get('payload') or request.args.get('payload') or QR_PAYLOAD_MODE).lower()
+        if payload_mode not in PAYLOAD_MODES:
+            raise ValueError(f"payload must be one of {', '.join(PAYLOAD_MODES)}")
+        options['payload'] = payload_mode
+    return options
+
+def int_option(data, name, default, low, high):
+    """Read an optional integer request field (body or query) within [low, high]"""
+    value = data.get(name, request.args.get(name))
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or isinstance(value, bool) or not low <= number <= high:
+        raise ValueError(f"{name} must be an integer from {low} to {high}")
+    return number
+
+def parse_qr_options(data):
+    """QR symbol settings: ECC level, fixed version and mask, module size and border
+
+    version and mask_pattern default to None, meaning fit the smallest version
+    and evaluate all eight masks; fixing them skips that work.
+    """
+    ecc = str(data.get('ecc') or request.args.get('ecc') or QR_ERROR_CORRECTION).upper()
+    if ecc not in QR_ERROR_CORRECTION_LEVELS:
+        raise ValueError(f"ecc must be one of {', '.join(QR_ERROR_CORRECTION_LEVELS)}")
+    return {
+        'ecc': ecc,
+        'version': int_option(data, 'version', None, 1, 40),
+        'mask_pattern': int_option(data, 'mask_pattern', None, 0, 7),
+        'box_size': int_option(data, 'box_size', QR_BOX_SIZE, 1, QR_MAX_BOX_SIZE),
+        'border': int_option(data, 'border', QR_BORDER, 0, QR_MAX_BORDER),
+    }
+
+def parse_raster_profile(data, image_format):
+    """Pick the raster profile for a request, checking it against an explicit format"""
+    profile = data.get('profile') or request.args.get('profile')
+    if profile:
+        profile = str(profile).lower()
+        if profile not in RASTER_PROFILES:
+            raise ValueError(f"profile must be one of {', '.join(RASTER_PROFILES)}")
+        if image_format and RASTER_PROFILES[profile]['extension'] != image_format:
+            raise ValueError(f"profile {profile} does not produce {image_format}")
+    else:
+        profile = RASTER_PROFILE
+        # An explicit format overrides a server default that encodes differently
+        if image_format and RASTER_PROFILES[profile]['extension'] != image_format:
+            profile = image_format
+    return {'format': RASTER_PROFILES[profile]['extension'], 'profile': profile}
+
+def image_extension(options):
+    return IMAGE_FORMATS[(options or {}).get('format', DEFAULT_IMAGE_FORMAT)][0]
+
+def image_mimetype(options):
+    return IMAGE_FORMATS[(options or {}).get('format', DEFAULT_IMAGE_FORMAT)][1]
+
+def build_qr(data, options=None):
+    """QRCode holding data with this request's settings, not yet made"""
+    options = options or {}
+    qr = qrcode.QRCode(
+        version=options.get('version'),
+        error_correction=QR_ERROR_CORRECTION_LEVELS[options.get('ecc', QR_ERROR_CORRECTION)],
+        box_size=options.get('box_size', QR_BOX_SIZE),
+        border=options.get('border', QR_BORDER),
+        mask_pattern=options.get('mask_pattern'),
+    )
+    qr.add_data(data)
+    return qr
+
+def qr_version(data, options=None):
+    """QR version data will be rendered at, raising ValueError if a fixed version is too small"""
+    qr = build_qr(data, options)
+    try:
+        needed = fit_version(qr)
+    except qrcode.exceptions.DataOverflowError:
+        ecc = (options or {}).get('ecc', QR_ERROR_CORRECTION)
+        raise ValueError(f"Data does not fit any QR version at ECC level {ecc}") from None
+    if qr.version is None:
+        return needed
+    if needed > qr.version:
+        raise ValueError(f"Data needs QR version {needed} or larger, not {qr.version}")
+    return qr.version
+
+def render_qr_code(data, options=None):
+    """Render QR code to raster or SVG bytes"""
+    options = options or {}
+    qr = build_qr(data, options)
+    # A fixed version skips fitting; a fixed mask_pattern skips mask evaluation
+    qr.make(fit=qr.version is None)
+    
+    buffer = io.BytesIO()
+    if options.get('format') == 'svg':
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+        return buffer.getvalue()
+    return encode_image(rasterize_qr(qr), options.get('profile', 'png'))
+
+def render_1d_barcode(data, barcode_type, options=None):
+    """Render 1D barcode to raster or SVG bytes, falling back to Code128"""
+    options = options or {}
+    write_text = options.get('text', True)
+    if options.get('format') != 'svg' and linear_barcodes.supports(barcode_type):
+        try:
+            pattern, text = linear_barcodes.encode(data, barcode_type)
+        except ValueError as e:
+            # Validation happens before drawing, so falling back costs no extra render
+            if barcode_type == 'code128':
+                raise e
+            logger.warning("%s failed (%s), falling back to Code128", barcode_type, e)
+            pattern, text = linear_barcodes.encode(data, 'code128')
+        image = linear_barcodes.rasterize(pattern, text if write_text else None)
+        return encode_image(image, options.get('profile', 'png'))
+
+    writer_class = SVGWriter if options.get('format') == 'svg' else ImageWriter
+    writer_options = {'write_text': write_text}
+    try:
+        barcode_class = barcode.get_barcode_class(barcode_type)
+        output = barcode_class(data, writer=writer_class()).render(writer_options)
+    except Exception as e:
+        # Fallback to Code128 if the specified type fails
+        if barcode_type == 'code128':
+            raise e
+        logger.warning("%s failed (%s), falling back to Code128", barcode_type, e)
+        barcode_class = barcode.get_barcode_class('code128')
+        output = barcode_class(data, writer=writer_class()).render(writer_options)
+    if writer_class is SVGWriter:
+        return output
+    return encode_image(output, options.get('profile', 'png'))
+
+def write_barcode_file(image_bytes, full_path):
+    """Store rendered image bytes under the file's name"""
+    image_store.put(os.path.basename(full_path), image_bytes)
+    return full_path
+
+def stored_image(full_path):
+    """StoredImage (size, mtime, etag) for a generated file, or None if it was not stored"""
+    return image_store.stat(os.path.basename(full_path))
+
+def schedule_barcode_write(image_bytes, full_path):
+    """Write image bytes on a background thread; failures are logged"""
+    global _deferred_writer, _deferred_writer_pid
+    if _deferred_writer is None or _deferred_writer_pid != os.getpid():
+        _deferred_writer = ThreadPoolExecutor(max_workers=DEFERRED_WRITE_WORKERS, thread_name_prefix='barcode-writer')
+        _deferred_writer_pid = os.getpid()
+    
+    def report(future):
+        if future.exception() is not None:
+            logger.error("Deferred write of %s failed: %s", full_path, future.exception())
+    
+    _deferred_writer.submit(write_barcode_file, image_bytes, full_path).add_done_callback(report)
+
+def render_qr_bytes(data, options=None, cache=True):
+    """Render QR code image bytes, through the render cache unless cache is False"""
+    logger.debug("Rendering QR code (%d chars): %r", len(data) if data else 0, data)
     
     if not data or data.strip() == '':
-        print("ERROR: Empty data provided for QR code generation")
+        logger.error("Empty data provided for QR code generation")
         raise ValueError("Empty data provided for QR code generation")
     
+    render = timed_render('qr', lambda: render_qr_code(data, options))
+    if not cache:
+        return render()
+    cache_key = render_cache.make_key('qr', data, options)
+    return render_cache.get_or_render(cache_key, render)
+
+def render_1d_bytes(data, barcode_type, options=None):
+    """Render 1D barcode image bytes through the render cache"""
+    logger.debug("Rendering %s barcode (%d chars): %r", barcode_type, len(data) if data else 0, data)
+    
+    if not data or data.strip() == '':
+        logger.error("Empty data provided for 1D barcode generation")
+        raise ValueError("Empty data provided for 1D barcode generation")
+    
+    cache_key = render_cache.make_key(barcode_type, data, options)
+    return render_cache.get_or_render(
+        cache_key, timed_render(barcode_type, lambda: render_1d_barcode(data, barcode_type, options)))
+
+def generate_qr_code(data, filename, options=None, cache=True):
+    """Generate QR code"""
     try:
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        image_bytes = render_qr_bytes(data, options, cache)
         
         # Save the image
-        full_path = f"{filename}.png"
-        print(f"DEBUG: Saving QR code to: {full_path}")
-        img.save(full_path)
+        full_path = f"{filename}.{image_extension(options)}"
+        with STAGE_LATENCY.time(stage='png_write', type='qr'):
+            write_barcode_file(image_bytes, full_path)
         
         # Verify the file was created
-        if os.path.exists(full_path):
-            file_size = os.path.getsize(full_path)
-            print(f"DEBUG: QR code saved successfully. File size: {file_size} bytes")
+        with STAGE_LATENCY.time(stage='file_check', type='qr'):
+            stored = stored_image(full_path)
+        if stored is not None:
+            logger.debug("QR code saved to %s (%d bytes)", full_path, stored.size)
         else:
-            print(f"ERROR: File was not created: {full_path}")
+            logger.error("File was not created: %s", full_path)
             raise FileNotFoundError(f"Failed to create file: {full_path}")
             
-        return f"{filename}.png"
+        return full_path
     except Exception as e:
-        print(f"ERROR: Failed to generate QR code: {e}")
+        logger.error("Failed to generate QR code: %s", e)
         raise e
 
-def generate_1d_barcode(data, barcode_type, filename):
+def generate_1d_barcode(data, barcode_type, filename, options=None):
     """Generate 1D barcode (Code128, EAN13, etc.)"""
-    print(f"DEBUG: Generating 1D barcode with data: '{data}'")
-    print(f"DEBUG: Barcode type: {barcode_type}")
-    print(f"DEBUG: Data type: {type(data)}")
-    print(f"DEBUG: Data length: {len(data) if data else 0}")
-    
-    if not data or data.strip() == '':
-        print("ERROR: Empty data provided for 1D barcode generation")
-        raise ValueError("Empty data provided for 1D barcode generation")
-    
-    try:
-        barcode_class = barcode.get_barcode_class(barcode_type)
-        barcode_instance = barcode_class(data, writer=ImageWriter())
-        # The ImageWriter automatically adds .png extension
-        barcode_instance.save(filename)
-        print(f"DEBUG: 1D barcode saved to: {filename}.png")
-        # Return the filename with .png extension
-        return f"{filename}.png"
-    except Exception as e:
-        print(f"DEBUG: Error generating {barcode_type}: {e}")
-        # Fallback to Code128 if the specified type fails
-        if barcode_type != 'code128':
-            print(f"Warning: {barcode_type} failed, falling back to Code128")
-            barcode_class = barcode.get_barcode_class('code128')
-            barcode_instance = barcode_class(data, writer=ImageWriter())
-            barcode_instance.save(filename)
-            print(f"DEBUG: Fallback Code128 barcode saved to: {filename}.png")
-            return f"{filename}.png"
-        else:
-            raise e
+    image_bytes = render_1d_bytes(data, barcode_type, options)
+    with STAGE_LATENCY.time(stage='png_write', type=type_label(barcode_type)):
+        full_path = write_barcode_file(image_bytes, f"{filename}.{image_extension(options)}")
+    logger.debug("1D barcode saved to %s", full_path)
+    return full_path
+
+def parse_barcode_request(data):
+    """Extract (data, type, source, metadata) from a generation request"""
+    barcode_data = data.get('data')
+    barcode_type = data.get('type', 'qr')  # qr, code128, ean13, etc.
+    source = data.get('source', 'web')  # web, mobile
+    metadata = data.get('metadata', {})
+    return barcode_data, barcode_type, source, metadata
+
+def build_qr_payload(barcode_data, metadata, source, mode='json', barcode_id=None):
+    """Build the string encoded into a QR code"""
+    # For QR codes, create comprehensive data structure with all metadata
+    if metadata and len(metadata) > 0:
+        # Pointer codes carry only the id; scanners look the rest up on the server
+        if mode == 'pointer' and barcode_id:
+            return barcode_id
+        # Create a comprehensive data structure for QR codes
+        qr_data = {
+            "product_name": metadata.get('product_name', barcode_data),
+            "product_id": metadata.get('product_id', 'N/A'),
+            "price": metadata.get('price', 'N/A'),
+            "location": metadata.get('location', 'N/A'),
+            "category": metadata.get('category', 'N/A'),
+            "timestamp": datetime.now().isoformat() if mode == 'json' else int(time.time()),
+            "source": source
+        }
+        # Convert to JSON string for QR code
+        qr_data_string = encode_fields(qr_data, mode)
+        logger.debug("QR code data structure: %s", qr_data_string)
+        return qr_data_string
+    # Fallback to original data if no metadata
+    return barcode_data
+
+def payload_is_cacheable(qr_payload, barcode_data):
+    """Metadata payloads carry the render time and pointer payloads a fresh barcode_id,
+    so only a payload of plain data can ever be rendered again"""
+    return qr_payload == barcode_data
+
+def build_qr_details(qr_payload, options):
+    """Payload mode and resulting QR version, reported back to the caller"""
+    return {'payload': (options or {}).get('payload', 'json'), 'qr_version': qr_version(qr_payload, options)}
+
+def render_barcode_bytes(barcode_data, barcode_type, source, metadata, options=None, barcode_id=None):
+    """Render a QR or 1D barcode to image bytes without touching BARCODES_DIR
+
+    Returns (image_bytes, details); details holds the QR version for QR codes.
+    """
+    if barcode_type.lower() == 'qr':
+        with STAGE_LATENCY.time(stage='payload', type='qr'):
+            qr_payload = build_qr_payload(barcode_data, metadata, source,
+                                          (options or {}).get('payload', 'json'), barcode_id)
+        details = build_qr_details(qr_payload, options)
+        return render_qr_bytes(qr_payload, options, payload_is_cacheable(qr_payload, barcode_data)), details
+    return render_1d_bytes(barcode_data, barcode_type, options), {}
+
+def resolve_response_mode(data):
+    """Pick json/image/base64 from the body, the query string or the Accept header"""
+    mode = data.get('response') or request.args.get('response')
+    if mode:
+        return str(mode).lower()
+    best = request.accept_mimetypes.best_match(['application/json', 'image/png', 'image/svg+xml'])
+    if best in ('image/png', 'image/svg+xml'):
+        return 'image'
+    return 'json'
+
+def render_barcode(barcode_data, barcode_type, source, metadata, filename, options=None, barcode_id=None):
+    """Generate a QR or 1D barcode image file and return (path, details)"""
+    if barcode_type.lower() == 'qr':
+        with STAGE_LATENCY.time(stage='payload', type='qr'):
+            qr_payload = build_qr_payload(barcode_data, metadata, source,
+                                          (options or {}).get('payload', 'json'), barcode_id)
+        details = build_qr_details(qr_payload, options)
+        return generate_qr_code(qr_payload, filename, options,
+                                payload_is_cacheable(qr_payload, barcode_data)), details
+    return generate_1d_barcode(barcode_data, barcode_type, filename, options), {}
 
 @app.route('/generate_barcode', methods=['POST'])
 def generate_barcode():
@@ -207,81 +660,71 @@ def generate_barcode():
     try:
         data = request.get_json()
         
-        # Debug logging
-        print(f"DEBUG: Received data: {data}")
-        print(f"DEBUG: Data type: {type(data)}")
+        logger.debug("Received generation request: %r", data)
         
         # Extract parameters
-        barcode_data = data.get('data')
-        barcode_type = data.get('type', 'qr')  # qr, code128, ean13, etc.
-        source = data.get('source', 'web')  # web, mobile
-        metadata = data.get('metadata', {})
-        
-        print(f"DEBUG: barcode_data: {barcode_data}")
-        print(f"DEBUG: barcode_type: {barcode_type}")
-        print(f"DEBUG: source: {source}")
-        print(f"DEBUG: metadata: {metadata}")
-        print(f"DEBUG: metadata type: {type(metadata)}")
+        barcode_data, barcode_type, source, metadata = parse_barcode_request(data)
+        response_mode = resolve_response_mode(data)
+        persist_mode = str(data.get('persist') or request.args.get('persist') or 'sync').lower()
         
         if not barcode_data:
             return jsonify({'error': 'Barcode data is required'}), 400
+        if response_mode not in RESPONSE_MODES:
+            return jsonify({'error': f"response must be one of {', '.join(RESPONSE_MODES)}"}), 400
+        if persist_mode not in PERSIST_MODES:
+            return jsonify({'error': f"persist must be one of {', '.join(PERSIST_MODES)}"}), 400
+        try:
+            render_options = parse_render_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Create barcodes directory if it doesn't exist
         os.makedirs('barcodes', exist_ok=True)
-        print(f"DEBUG: Created barcodes directory")
-        
-        # Generate filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = os.path.join(BARCODES_DIR, f"{barcode_type}_{timestamp}")
-        print(f"DEBUG: Generated filename: {filename}")
-        
-        # Generate barcode based on type
-        print(f"DEBUG: Starting barcode generation for type: {barcode_type}")
-        if barcode_type.lower() == 'qr':
-            print(f"DEBUG: Calling generate_qr_code")
-            # For QR codes, create comprehensive data structure with all metadata
-            if metadata and len(metadata) > 0:
-                # Create a comprehensive data structure for QR codes
-                qr_data = {
-                    "product_name": metadata.get('product_name', barcode_data),
-                    "product_id": metadata.get('product_id', 'N/A'),
-                    "price": metadata.get('price', 'N/A'),
-                    "location": metadata.get('location', 'N/A'),
-                    "category": metadata.get('category', 'N/A'),
-                    "timestamp": datetime.now().isoformat(),
-                    "source": source
-                }
-                # Convert to JSON string for QR code
-                qr_data_string = json.dumps(qr_data, indent=2)
-                print(f"DEBUG: QR code data structure: {qr_data_string}")
-                final_filename = generate_qr_code(qr_data_string, filename)
-            else:
-                # Fallback to original data if no metadata
-                final_filename = generate_qr_code(barcode_data, filename)
-            print(f"DEBUG: QR code generation returned: {final_filename}")
-        else:
-            print(f"DEBUG: Calling generate_1d_barcode")
-            final_filename = generate_1d_barcode(barcode_data, barcode_type, filename)
-            print(f"DEBUG: 1D barcode generation returned: {final_filename}")
         
-        # Verify file was created
-        if not os.path.exists(final_filename):
-            print(f"ERROR: File was not created: {final_filename}")
-            return jsonify({'error': f'Failed to create barcode file: {final_filename}'}), 500
+        # One unique id names both the file and the barcode (pointer QR codes encode it)
+        uid = id_generator.new_id()
+        filename = os.path.join(BARCODES_DIR, f"{barcode_type}_{uid}")
+        barcode_id = generate_barcode_id(barcode_type, uid)
         
-        print(f"DEBUG: File exists: {final_filename}")
+        # Generate barcode based on type, in memory
+        try:
+            image_bytes, details = render_barcode_bytes(
+                barcode_data, barcode_type, source, metadata, render_options, barcode_id)
+        except ValueError as e:
+            # Data the chosen symbology or QR version cannot hold
+            return jsonify({'error': str(e)}), 400
+        if 'qr_version' in details:
+            QR_VERSIONS.observe(details['qr_version'], payload=details['payload'])
         
-        # Generate unique barcode ID
-        product_id_from_metadata = metadata.get('product_id', 'UNKNOWN') if metadata else 'UNKNOWN'
-        barcode_id = generate_barcode_id(barcode_type, product_id_from_metadata)
-        print(f"DEBUG: Generated barcode ID: {barcode_id}")
+        final_filename = None if persist_mode == 'none' else f"{filename}.{image_extension(render_options)}"
+        if persist_mode == 'sync':
+            with STAGE_LATENCY.time(stage='png_write', type=type_label(barcode_type)):
+                write_barcode_file(image_bytes, final_filename)
+            
+            # Verify file was created
+            with STAGE_LATENCY.time(stage='file_check', type=type_label(barcode_type)):
+                file_exists = stored_image(final_filename) is not None
+            if not file_exists:
+                logger.error("File was not created: %s", final_filename)
+                return jsonify({'error': f'Failed to create barcode file: {final_filename}'}), 500
+        elif persist_mode == 'deferred':
+            schedule_barcode_write(image_bytes, final_filename)
         
         # Save to database with the final filename (including .png extension)
-        print(f"DEBUG: Saving to database")
         save_barcode_to_db(barcode_id, barcode_data, barcode_type, source, final_filename, metadata)
-        print(f"DEBUG: Saved to database successfully")
+        logger.debug("Saved %s (%s) to database", barcode_id, final_filename)
+        BARCODES_GENERATED.inc(type=type_label(barcode_type), source=source_label(source))
         
-        return jsonify({
+        if response_mode == 'image':
+            response = Response(image_bytes, mimetype=image_mimetype(render_options))
+            response.headers['X-Barcode-Id'] = barcode_id
+            if 'qr_version' in details:
+                response.headers['X-QR-Version'] = str(details['qr_version'])
+            if final_filename:
+                response.headers['X-Barcode-Filename'] = os.path.basename(final_filename)
+            return response
+        
+        result = {
             'success': True,
             'message': f'{barcode_type.upper()} barcode generated successfully',
             'barcode_id': barcode_id,
@@ -289,81 +732,465 @@ def generate_barcode():
             'data': barcode_data,
             'type': barcode_type,
             'source': source
+        }
+        result.update(details)
+        if response_mode == 'base64':
+            result['mimetype'] = image_mimetype(render_options)
+            result['image_base64'] = base64.b64encode(image_bytes).decode('ascii')
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.exception("Exception in generate_barcode: %s", e)
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            GENERATION_ERRORS.inc(type=type_label(payload.get('type', 'qr')),
+                                  source=source_label(payload.get('source', 'web')))
+        return jsonify({'error': str(e)}), 500
+
+def render_batch_item(job):
+    """Render one bulk generation item (runs in a worker process)"""
+    index, barcode_data, barcode_type, source, metadata, filename, options, barcode_id = job
+    start = time.perf_counter()
+    try:
+        final_filename, details = render_barcode(
+            barcode_data, barcode_type, source, metadata, filename, options, barcode_id)
+        # Worker processes keep their own metrics, so the parent records the timing
+        return {'index': index, 'filename': final_filename, 'details': details,
+                'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'index': index, 'error': str(e)}
+
+def get_batch_pool():
+    """Return the process pool used for bulk rendering and decoding, creating it on first use"""
+    global _batch_pool
+    if _batch_pool is None:
+        _batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+    return _batch_pool
+
+def map_batch(func, items, parallel_threshold=BATCH_PARALLEL_THRESHOLD):
+    """Map a module-level func over items in the batch pool, serially for small inputs"""
+    global _batch_pool
+    if len(items) < parallel_threshold or BATCH_WORKERS <= 1:
+        return [func(item) for item in items]
+    
+    chunksize = max(1, len(items) // (BATCH_WORKERS * 4))
+    try:
+        return list(get_batch_pool().map(func, items, chunksize=chunksize))
+    except BrokenProcessPool as e:
+        logger.warning("Batch process pool failed (%s), running serially", e)
+        _batch_pool = None
+        return [func(item) for item in items]
+
+def render_batch(jobs):
+    """Render bulk generation jobs, in parallel when the batch is large enough"""
+    return map_batch(render_batch_item, jobs)
+
+def prepare_batch(items):
+    """Validate bulk items into (results, jobs); parsing options needs the request context"""
+    results = [None] * len(items)
+    jobs = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get('data'):
+            results[index] = {'index': index, 'success': False, 'error': 'Barcode data is required'}
+            continue
+        barcode_data, barcode_type, source, metadata = parse_barcode_request(item)
+        try:
+            options = parse_render_options(item)
+        except ValueError as e:
+            results[index] = {'index': index, 'success': False, 'error': str(e)}
+            continue
+        # Ids are issued here, not in the workers, so a retried job reuses them
+        uid = id_generator.new_id()
+        filename = os.path.join(BARCODES_DIR, f"{barcode_type}_{uid}")
+        barcode_id = generate_barcode_id(barcode_type, uid)
+        jobs.append((index, barcode_data, barcode_type, source, metadata, filename, options, barcode_id))
+    return results, jobs
+
+def run_batch(results, jobs, progress=None, ignore_existing=False):
+    """Render and save prepared bulk jobs and return the response summary
+
+    progress(done) is called after each chunk of JOB_PROGRESS_CHUNK jobs.
+    """
+    rows = []
+    chunk_size = JOB_PROGRESS_CHUNK if progress else max(1, len(jobs))
+    for start in range(0, len(jobs), chunk_size):
+        chunk = jobs[start:start + chunk_size]
+        for job, outcome in zip(chunk, render_batch(chunk)):
+            index, barcode_data, barcode_type, source, metadata, _, options, barcode_id = job
+            if 'error' in outcome:
+                results[index] = {'index': index, 'success': False, 'error': outcome['error']}
+                GENERATION_ERRORS.inc(type=type_label(barcode_type), source=source_label(source))
+                continue
+            STAGE_LATENCY.observe(outcome['seconds'], stage='batch_render', type=type_label(barcode_type))
+            if 'qr_version' in outcome['details']:
+                QR_VERSIONS.observe(outcome['details']['qr_version'], payload=outcome['details']['payload'])
+            
+            rows.append(build_barcode_row(barcode_id, barcode_data, barcode_type, source, outcome['filename'], metadata))
+            results[index] = {
+                'index': index,
+                'success': True,
+                'barcode_id': barcode_id,
+                'filename': outcome['filename'],
+                'data': barcode_data,
+                'type': barcode_type,
+                'source': source,
+                **outcome['details']
+            }
+        if progress:
+            progress(start + len(chunk))
+    
+    # All rows go in with one executemany inside one transaction
+    if rows:
+        save_barcodes_to_db(rows, ignore_existing)
+        for row in rows:
+            BARCODES_GENERATED.inc(type=type_label(row[2]), source=source_label(row[3]))
+    
+    succeeded = len(rows)
+    return {
+        'success': succeeded > 0,
+        'total': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results
+    }
+
+def run_batch_job(job):
+    """Job handler for asynchronous /generate_barcodes requests"""
+    # A retried job may already have saved its rows before the worker died
+    return run_batch(job.payload['results'], job.payload['jobs'],
+                     progress=job.progress, ignore_existing=job.attempts > 1)
+
+job_queue.register('generate_barcodes', run_batch_job)
+
+@app.route('/generate_barcodes', methods=['POST'])
+def generate_barcodes():
+    """API endpoint to generate many barcodes in one request
+    
+    With "async": true (or ?async=1) the batch is queued and 202 returned with
+    a job id to poll at /jobs/<job_id>.
+    """
+    try:
+        payload = request.get_json()
+        items = payload.get('items') if isinstance(payload, dict) else payload
+        run_async = payload.get('async') if isinstance(payload, dict) else None
+        if run_async is None:
+            run_async = request.args.get('async', '').lower() in ('1', 'true', 'yes')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'A non-empty list of barcode requests is required'}), 400
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({'error': f'Batch too large: {len(items)} items (max {BATCH_MAX_ITEMS})'}), 413
+        
+        results, jobs = prepare_batch(items)
+        
+        if run_async:
+            job_id = job_queue.submit('generate_barcodes', {'results': results, 'jobs': jobs}, total=len(jobs))
+            response = jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': f'/jobs/{job_id}'
+            })
+            response.headers['Location'] = f'/jobs/{job_id}'
+            return response, 202
+        
+        return jsonify(run_batch(results, jobs))
+        
+    except Exception as e:
+        logger.exception("Exception in generate_barcodes: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+def collect_uploaded_images():
+    """(name, bytes) pairs from multipart files, a JSON body of base64 images, or a raw image body"""
+    if request.files:
+        return [(upload.filename or field, upload.read())
+                for field in request.files for upload in request.files.getlist(field)]
+    if request.is_json:
+        body = request.get_json()
+        encoded = body.get('images') or ([body['image']] if body.get('image') else [])
+        images = []
+        for index, item in enumerate(encoded):
+            # Accept data: URLs as produced by canvas.toDataURL()
+            if item.startswith('data:'):
+                item = item.split(',', 1)[-1]
+            images.append((f'image_{index}', base64.b64decode(item)))
+        return images
+    if request.mimetype.startswith('image/'):
+        return [('image', request.get_data())]
+    return []
+
+def parse_decode_mode():
+    """Decode mode from the query string, form field or JSON body"""
+    mode = request.args.get('mode') or request.form.get('mode')
+    if mode is None and request.is_json:
+        body = request.get_json()
+        if not isinstance(body, dict):
+            raise ValueError("JSON body must be an object")
+        mode = body.get('mode')
+    mode = mode or 'full'
+    if mode not in DECODE_MODES:
+        raise ValueError(f"mode must be one of {', '.join(DECODE_MODES)}")
+    return mode
+
+@app.route('/decode', methods=['POST'])
+def decode_barcodes():
+    """Decode barcodes in one or many uploaded images
+    
+    Returns symbology, data and bounding box for every symbol found, per image.
+    mode=regions localizes and decodes candidate regions for large multi-code shots.
+    """
+    try:
+        try:
+            mode = parse_decode_mode()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            images = collect_uploaded_images()
+        except (ValueError, AttributeError) as e:
+            return jsonify({'error': f'Invalid image payload: {e}'}), 400
+        
+        if not images:
+            return jsonify({'error': 'Upload one or more images (multipart, base64 JSON or raw image body)'}), 400
+        if len(images) > DECODE_MAX_IMAGES:
+            return jsonify({'error': f'Too many images: {len(images)} (max {DECODE_MAX_IMAGES})'}), 413
+        
+        outcomes = map_batch(partial(decode_image_bytes, mode=mode), [image_bytes for _, image_bytes in images],
+                             DECODE_PARALLEL_THRESHOLD)
+        
+        results = []
+        for index, ((name, _), outcome) in enumerate(zip(images, outcomes)):
+            STAGE_LATENCY.observe(outcome['seconds'], stage='decode', type='image')
+            if 'error' in outcome:
+                results.append({'index': index, 'name': name, 'success': False, 'error': outcome['error']})
+                continue
+            for symbol in outcome['barcodes']:
+                BARCODES_DECODED.inc(type=symbol['type'])
+            results.append({
+                'index': index,
+                'name': name,
+                'success': True,
+                'width': outcome['width'],
+                'height': outcome['height'],
+                'count': len(outcome['barcodes']),
+                'barcodes': outcome['barcodes']
+            })
+        
+        return jsonify({
+            'success': True,
+            'backend': decoder_backend(),
+            'mode': mode,
+            'images': len(results),
+            'results': results
         })
         
     except Exception as e:
-        print(f"ERROR: Exception in generate_barcode: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in decode: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def iter_stream_frames():
+    """Encoded frames from multipart files, in upload order, or a length-prefixed body"""
+    if request.files:
+        for field in request.files:
+            for upload in request.files.getlist(field):
+                yield upload.read()
+    else:
+        yield from iter_frames(request.stream)
+
+@app.route('/scan_stream', methods=['POST'])
+def scan_stream():
+    """Decode a camera feed frame by frame, streaming each barcode once per pass as NDJSON
+    
+    Repeated frames are skipped and known barcodes are re-read from their last region only.
+    """
+    try:
+        mode = parse_decode_mode()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def events():
+        session = ScanSession(mode=mode)
+        start = time.perf_counter()
+        try:
+            for frame in iter_stream_frames():
+                try:
+                    symbols = session.feed_image(frame)
+                except ValueError as e:
+                    yield json.dumps({'frame': session.frames, 'error': str(e)}) + '\n'
+                    continue
+                for symbol in symbols:
+                    BARCODES_DECODED.inc(type=symbol['type'])
+                    yield json.dumps(symbol) + '\n'
+        except ValueError as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+        seconds = time.perf_counter() - start
+        summary = dict(session.stats(), done=True, seconds=round(seconds, 3),
+                       fps=round(session.frames / seconds, 1) if seconds else None)
+        yield json.dumps(summary) + '\n'
+    
+    return Response(stream_with_context(events()), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Status, progress and (once done) result of a background job"""
+    try:
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'job': job})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def send_barcode_file(key):
+    """Serve an immutable stored image with validators, long-lived caching and Range support
+    
+    Conditional requests get 304s; in a sendfile mode the front server sends
+    the bytes and handles Range itself. Packed images are sent from memory.
+    """
+    stored = image_store.stat(key)
+    if stored is None:
+        return None
+    extension = os.path.splitext(key)[1].lstrip('.').lower()
+    mimetype = EXTENSION_MIMETYPES.get(extension, 'application/octet-stream')
+    file_path = image_store.path(key)
+    
+    if BARCODE_SENDFILE and file_path:
+        response = Response(mimetype=mimetype)
+        if BARCODE_SENDFILE == 'x-sendfile':
+            response.headers['X-Sendfile'] = os.path.abspath(file_path)
+        else:
+            response.headers['X-Accel-Redirect'] = BARCODE_ACCEL_PREFIX + quote(key)
+        response.set_etag(stored.etag)
+        response.last_modified = stored.mtime
+        response = response.make_conditional(request)
+    else:
+        source = file_path or io.BytesIO(image_store.get(key))
+        response = send_file(source, mimetype=mimetype, etag=stored.etag, last_modified=stored.mtime,
+                             max_age=BARCODE_CACHE_MAX_AGE, conditional=True, download_name=key)
+    
+    response.cache_control.public = True
+    response.cache_control.max_age = BARCODE_CACHE_MAX_AGE
+    response.cache_control.immutable = True
+    response.cache_control.no_cache = None
+    return response
+
 @app.route('/get_barcode/<filename>')
 def get_barcode(filename):
     """Serve generated barcode image"""
     try:
-        print(f"DEBUG: Requesting barcode file: {filename}")
-        
         # Handle both full path and just filename
-        if filename.startswith(BARCODES_DIR + '/'):
-            file_path = filename
-        else:
-            file_path = os.path.join(BARCODES_DIR, filename)
-            
-        print(f"DEBUG: Full file path: {file_path}")
-        print(f"DEBUG: File exists: {os.path.exists(file_path)}")
-        
-        if os.path.exists(file_path):
-            print(f"DEBUG: Serving file: {file_path}")
-            return send_file(file_path, mimetype='image/png')
-        else:
-            print(f"DEBUG: File not found: {file_path}")
-            # List files in barcodes directory for debugging
-            if os.path.exists('barcodes'):
-                files = os.listdir('barcodes')
-                print(f"DEBUG: Files in barcodes directory: {files}")
-            else:
-                print(f"DEBUG: barcodes directory does not exist")
+        key = os.path.basename(filename)
+        response = send_barcode_file(key)
+        if response is None:
+            logger.debug("Barcode not found: %s", key)
             return jsonify({'error': 'Barcode not found'}), 404
+        logger.debug("Serving barcode: %s", key)
+        return response
+    except HTTPException:
+        # 416 for an unsatisfiable Range
+        raise
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"DEBUG: Error serving file: {e}")
+        logger.error("Error serving file %s: %s", filename, e)
         return jsonify({'error': str(e)}), 500
 
+def barcode_row_to_dict(row):
+    """Convert a BARCODE_COLUMNS row into the API representation"""
+    return {
+        'id': row[0],
+        'barcode_id': row[1],
+        'data': row[2],
+        'type': row[3],
+        'source': row[4],
+        'created_at': row[5],
+        'file_path': row[6],
+        'metadata': json.loads(row[7]) if row[7] else None,
+        'product_name': row[8],
+        'product_id': row[9],
+        'price': row[10],
+        'location_x': row[11],
+        'location_y': row[12],
+        'location_z': row[13],
+        'category': row[14]
+    }
+
+def encode_list_cursor(created_at, row_id):
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    raw = json.dumps([created_at, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_list_cursor(cursor):
+    """Decode a cursor produced by encode_list_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def parse_timestamp_filter(value, name):
+    """Normalize an ISO date/datetime filter to the created_at storage format"""
+    try:
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' timestamp: {value}")
+
 @app.route('/list_barcodes')
 def list_barcodes():
-    """List all generated barcodes"""
+    """List generated barcodes, newest first, one keyset page at a time
+    
+    Query parameters: limit, cursor, type, source, category, from, to
+    """
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        try:
+            limit = int(request.args.get('limit', LIST_DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        limit = max(1, min(limit, LIST_MAX_PAGE_SIZE))
         
-        cursor.execute('''
-            SELECT id, barcode_id, barcode_data, barcode_type, source, created_at, file_path, metadata,
-                   product_name, product_id, price, location_x, location_y, location_z, category
+        conditions = []
+        params = []
+        for arg, column in (('type', 'barcode_type'), ('source', 'source'), ('category', 'category')):
+            value = request.args.get(arg)
+            if value:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        
+        try:
+            if request.args.get('from'):
+                conditions.append('created_at >= ?')
+                params.append(parse_timestamp_filter(request.args['from'], 'from'))
+            if request.args.get('to'):
+                conditions.append('created_at <= ?')
+                params.append(parse_timestamp_filter(request.args['to'], 'to'))
+            if request.args.get('cursor'):
+                conditions.append('(created_at, id) < (?, ?)')
+                params.extend(decode_list_cursor(request.args['cursor']))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        cursor = db_pool.connection().cursor()
+        cursor.execute(f'''
+            SELECT {BARCODE_COLUMNS}
             FROM barcodes
-            ORDER BY created_at DESC
-        ''')
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        ''', params + [limit + 1])
+        rows = cursor.fetchall()
         
-        barcodes = []
-        for row in cursor.fetchall():
-            barcodes.append({
-                'id': row[0],
-                'barcode_id': row[1],
-                'data': row[2],
-                'type': row[3],
-                'source': row[4],
-                'created_at': row[5],
-                'file_path': row[6],
-                'metadata': json.loads(row[7]) if row[7] else None,
-                'product_name': row[8],
-                'product_id': row[9],
-                'price': row[10],
-                'location_x': row[11],
-                'location_y': row[12],
-                'location_z': row[13],
-                'category': row[14]
-            })
+        # One extra row tells us whether another page exists
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_list_cursor(rows[-1][5], rows[-1][0])
         
-        conn.close()
-        return jsonify({'barcodes': barcodes})
+        return jsonify({
+            'barcodes': [barcode_row_to_dict(row) for row in rows],
+            'next_cursor': next_cursor,
+            'limit': limit
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -372,38 +1199,18 @@ def list_barcodes():
 def get_barcode_by_id(barcode_id):
     """Get barcode details by barcode ID"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        cursor = db_pool.connection().cursor()
         
-        cursor.execute('''
-            SELECT id, barcode_id, barcode_data, barcode_type, source, created_at, file_path, metadata,
-                   product_name, product_id, price, location_x, location_y, location_z, category
+        cursor.execute(f'''
+            SELECT {BARCODE_COLUMNS}
             FROM barcodes
             WHERE barcode_id = ?
         ''', (barcode_id,))
         
         row = cursor.fetchone()
-        conn.close()
         
         if row:
-            barcode = {
-                'id': row[0],
-                'barcode_id': row[1],
-                'data': row[2],
-                'type': row[3],
-                'source': row[4],
-                'created_at': row[5],
-                'file_path': row[6],
-                'metadata': json.loads(row[7]) if row[7] else None,
-                'product_name': row[8],
-                'product_id': row[9],
-                'price': row[10],
-                'location_x': row[11],
-                'location_y': row[12],
-                'location_z': row[13],
-                'category': row[14]
-            }
-            return jsonify(barcode)
+            return jsonify(barcode_row_to_dict(row))
         else:
             return jsonify({'error': 'Barcode not found'}), 404
             
@@ -414,10 +1221,7 @@ def get_barcode_by_id(barcode_id):
 def get_barcode_data(barcode_id):
     """Get structured barcode data by ID"""
     try:
-        print(f"DEBUG: Requesting barcode data for ID: {barcode_id}")
-        
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        cursor = db_pool.connection().cursor()
         
         cursor.execute('''
             SELECT barcode_data, barcode_type, metadata, created_at, source
@@ -426,7 +1230,6 @@ def get_barcode_data(barcode_id):
         ''', (barcode_id,))
         
         result = cursor.fetchone()
-        conn.close()
         
         if result:
             barcode_data, barcode_type, metadata, created_at, source = result
@@ -443,9 +1246,215 @@ def get_barcode_data(barcode_id):
             return jsonify({'error': 'Barcode not found'}), 404
             
     except Exception as e:
-        print(f"ERROR: Exception in get_barcode_data: {e}")
+        logger.error("Exception in get_barcode_data: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+def resolve_payload(conn, code):
+    """Resolve a scanned json/compact/base45 QR payload to the newest barcode for its product_id"""
+    fields = decode_payload(code)
+    if not isinstance(fields, dict) or fields.get('product_id') in (None, '', 'N/A'):
+        return None
+    row = conn.execute(
+        f'SELECT {BARCODE_COLUMNS} FROM barcodes WHERE product_id = ? ORDER BY created_at DESC, id DESC LIMIT 1',
+        (str(fields['product_id']),)
+    ).fetchone()
+    if row is None:
+        return None
+    return {'matched': 'payload', 'payload': fields, 'barcode': barcode_row_to_dict(row)}
+
+def resolve_code(conn, code):
+    """Resolve a scanned barcode_id, barcode_data or metadata QR payload, or None"""
+    match = scan_index.resolve(conn, code)
+    if match is None:
+        # Not a stored id or data: perhaps a QR code carrying product metadata
+        return resolve_payload(conn, code)
+    row_id, matched = match
+    row = conn.execute(f'SELECT {BARCODE_COLUMNS} FROM barcodes WHERE id = ?', (row_id,)).fetchone()
+    if row is None:
+        # Deleted outside this process (database_manager, setup_database)
+        scan_index.discard(row_id)
+        return None
+    return {'matched': matched, 'barcode': barcode_row_to_dict(row)}
+
+@app.route('/resolve', methods=['GET', 'POST'])
+def resolve():
+    """Resolve scanned codes (barcode_id, raw barcode_data or QR payload) to their records
+    
+    GET /resolve?code=... for one scan, POST {"codes": [...]} for many.
+    """
+    try:
+        conn = db_pool.connection()
+        if request.method == 'GET':
+            code = request.args.get('code')
+            if not code:
+                return jsonify({'error': 'Query parameter code is required'}), 400
+            result = resolve_code(conn, code)
+            if result is None:
+                return jsonify({'found': False, 'code': code, 'error': 'Barcode not found'}), 404
+            return jsonify(dict(result, found=True, code=code))
+        
+        codes = (request.get_json(silent=True) or {}).get('codes')
+        if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+            return jsonify({'error': 'Body must be {"codes": [...]} with string codes'}), 400
+        if len(codes) > RESOLVE_MAX_CODES:
+            return jsonify({'error': f'Too many codes: {len(codes)} (max {RESOLVE_MAX_CODES})'}), 413
+        results = []
+        for code in codes:
+            result = resolve_code(conn, code)
+            results.append(dict(result, found=True, code=code) if result else {'found': False, 'code': code})
+        return jsonify({'count': len(results), 'found': sum(r['found'] for r in results), 'results': results})
+        
+    except Exception as e:
+        logger.exception("Exception in resolve: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/search')
+def search():
+    """Ranked full-text prefix search over product name/id, barcode id and description"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), SEARCH_MAX_RESULTS))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    try:
+        rows = search_barcodes(db_pool.connection(), query, limit)
+        results = [{
+            'id': row[0],
+            'barcode_id': row[1],
+            'product_name': row[2],
+            'product_id': row[3],
+            'type': row[4],
+            'created_at': row[5],
+            'rank': row[6]
+        } for row in rows]
+        return jsonify({'query': query, 'count': len(results), 'results': results})
+    except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def float_arg(name, default=None):
+    """Read a float query parameter, raising ValueError naming the parameter"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        if default is None:
+            raise ValueError(f"Query parameter '{name}' is required")
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Query parameter '{name}' must be a number")
+
+@app.route('/locations/within')
+def locations_within():
+    """Barcodes located inside a bounding box (min_x..max_x, min_y..max_y[, min_z..max_z])"""
+    try:
+        box = {
+            'min_x': float_arg('min_x'), 'max_x': float_arg('max_x'),
+            'min_y': float_arg('min_y'), 'max_y': float_arg('max_y'),
+            'min_z': float_arg('min_z', float('-inf')), 'max_z': float_arg('max_z', float('inf')),
+        }
+        limit = max(1, min(int(request.args.get('limit', LOCATION_MAX_RESULTS)), LOCATION_MAX_RESULTS))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        rows = find_within(db_pool.connection(), BARCODE_COLUMNS, product_id=request.args.get('product_id'),
+                           limit=limit, **box)
+        barcodes = [barcode_row_to_dict(row) for row in rows]
+        return jsonify({'count': len(barcodes), 'barcodes': barcodes})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/locations/nearest')
+def locations_nearest():
+    """The k barcodes closest to (x, y[, z]), optionally for one product_id"""
+    try:
+        x = float_arg('x')
+        y = float_arg('y')
+        z = float_arg('z') if request.args.get('z') else None
+        k = max(1, min(int(request.args.get('k', 5)), NEAREST_MAX_K))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        matches = find_nearest(db_pool.connection(), BARCODE_COLUMNS, x, y, z, k=k,
+                               product_id=request.args.get('product_id'))
+        barcodes = []
+        for row, distance in matches:
+            barcode = barcode_row_to_dict(row)
+            barcode['distance'] = distance
+            barcodes.append(barcode)
+        return jsonify({'count': len(barcodes), 'barcodes': barcodes})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+EXPORT_MIMETYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+@app.route('/export')
+def export_barcodes():
+    """Stream every barcode record as NDJSON, CSV or JSON, optionally gzipped"""
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported export format: {fmt}"}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    
+    try:
+        cursor = db_pool.connection().cursor()
+        cursor.execute('SELECT * FROM barcodes ORDER BY id')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    chunks = iter_export_chunks(cursor, fmt)
+    filename = f"barcode_export.{fmt}"
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+    
+    response = Response(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else EXPORT_MIMETYPES[fmt]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def prepare_process():
+    # gunicorn never calls init_database(), so each process brings the schema up
+    # to date itself; job workers only start once their table exists, and since
+    # threads do not survive a fork each process starts its own
+    ensure_schema()
+    job_queue.start()
+
+@app.after_request
+def record_request_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            endpoint=request.endpoint or 'unknown', method=request.method, status=response.status_code
+        )
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text-format metrics for this worker process"""
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Render cache hit/miss counters, scan index and image store state"""
+    return jsonify(dict(render_cache.stats(), scan_index=scan_index.stats(), image_store=image_store.stats()))
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
@@ -478,10 +1487,21 @@ if __name__ == '__main__':
     print("Barcode Generator Server Starting...")
     print("Available endpoints:")
     print("- POST /generate_barcode - Generate new barcode")
+    print("- POST /generate_barcodes - Generate a batch of barcodes (async=1 queues a job)")
+    print("- GET /jobs/<job_id> - Background job status and result")
+    print("- POST /decode - Decode barcodes in uploaded images")
+    print("- POST /scan_stream - Decode a stream of camera frames (NDJSON events)")
     print("- GET /get_barcode/<filename> - Get barcode image")
     print("- GET /get_barcode_by_id/<barcode_id> - Get barcode details by ID")
     print("- GET /get_barcode_data/<barcode_id> - Get structured barcode data")
-    print("- GET /list_barcodes - List all barcodes")
+    print("- GET|POST /resolve - Resolve scanned codes to barcode records")
+    print("- GET /list_barcodes - List barcodes (paged, filterable)")
+    print("- GET /search?q=<text> - Full-text barcode search")
+    print("- GET /locations/within - Barcodes inside a bounding box")
+    print("- GET /locations/nearest - k nearest barcodes to a point")
+    print("- GET /export - Stream all records (format=ndjson|csv|json, gzip=1)")
+    print("- GET /metrics - Prometheus metrics")
+    print("- GET /cache_stats - Render cache statistics")
     print("- GET /health - Health check")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
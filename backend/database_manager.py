@@ -7,12 +7,85 @@ Provides utilities for database operations
 import sqlite3
 import json
 import os
+import csv
+import io
+import gzip
+import zlib
 from datetime import datetime
+from search_index import ensure_search_index, search_barcodes
+
+EXPORT_FORMATS = ('json', 'ndjson', 'csv')
+LINE_EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_CHUNK_SIZE = 1000
+CHECKPOINT_FILENAME = 'export_checkpoint.json'
+
+def encode_rows(columns, rows, fmt='ndjson', ensure_ascii=True):
+    """Encode rows as NDJSON lines or CSV records (no header)"""
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        csv.writer(buffer).writerows(rows)
+    else:
+        for row in rows:
+            buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=ensure_ascii, default=str))
+            buffer.write('\n')
+    return buffer.getvalue()
+
+def iter_export_chunks(cursor, fmt='ndjson', chunk_size=EXPORT_CHUNK_SIZE, stats=None, ensure_ascii=True):
+    """Yield text chunks for the rows of an executed cursor, fetchmany() at a time
+    
+    json output matches json.dump(records, indent=2); stats['rows'] counts rows written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    
+    columns = [description[0] for description in cursor.description]
+    if stats is not None:
+        stats['rows'] = 0
+    
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+    
+    first = True
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        
+        if fmt in LINE_EXPORT_FORMATS:
+            text = encode_rows(columns, rows, fmt, ensure_ascii)
+        else:
+            buffer = io.StringIO()
+            for row in rows:
+                record = dict(zip(columns, row))
+                buffer.write('[\n  ' if first else ',\n  ')
+                buffer.write(json.dumps(record, indent=2, ensure_ascii=ensure_ascii, default=str).replace('\n', '\n  '))
+                first = False
+            text = buffer.getvalue()
+        
+        if stats is not None:
+            stats['rows'] += len(rows)
+        yield text
+    
+    if fmt == 'json':
+        yield '[]' if first else '\n]'
+
+def gzip_chunks(chunks):
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
 
 class BarcodeDatabase:
     def __init__(self, db_path='barcodes.db'):
         self.db_path = db_path
         self.conn = None
+        self._search_ready = False
     
     def connect(self):
         """Connect to database"""
@@ -51,41 +124,159 @@ class BarcodeDatabase:
         }
     
     def search_barcodes(self, query, limit=10):
-        """Search barcodes by product name or ID"""
+        """Search barcodes by product name, product ID, barcode ID or description (ranked)"""
         if not self.conn:
             self.connect()
+        if not self._search_ready:
+            ensure_search_index(self.conn)
+            self._search_ready = True
         
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT barcode_id, product_name, product_id, barcode_type, created_at
-            FROM barcodes 
-            WHERE product_name LIKE ? OR product_id LIKE ? OR barcode_id LIKE ?
-            ORDER BY created_at DESC
-            LIMIT ?
-        """, (f'%{query}%', f'%{query}%', f'%{query}%', limit))
-        
-        return cursor.fetchall()
+        rows = search_barcodes(self.conn, query, limit)
+        return [(row[1], row[2], row[3], row[4], row[5]) for row in rows]
     
     def export_to_json(self, filename='barcode_export.json'):
         """Export all barcodes to JSON file"""
+        return self.export_stream(filename, fmt='json')
+    
+    def export_stream(self, filename, fmt='ndjson', compress=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """Export all barcodes row by row with constant memory
+        
+        fmt is one of EXPORT_FORMATS; compress defaults to True for .gz filenames.
+        """
+        if not self.conn:
+            self.connect()
+        if compress is None:
+            compress = filename.endswith('.gz')
+        
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM barcodes ORDER BY id")
+        
+        stats = {}
+        opener = gzip.open if compress else open
+        with opener(filename, 'wt', encoding='utf-8', newline='') as f:
+            for chunk in iter_export_chunks(cursor, fmt, chunk_size, stats):
+                f.write(chunk)
+        
+        print(f"Exported {stats['rows']} records to {filename}")
+        return stats['rows']
+    
+    @staticmethod
+    def load_checkpoint(checkpoint_file):
+        """Read an incremental export checkpoint (empty if none yet)"""
+        if not os.path.exists(checkpoint_file):
+            return {'last_id': 0}
+        with open(checkpoint_file, 'r') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def save_checkpoint(checkpoint_file, checkpoint):
+        """Atomically replace the checkpoint file"""
+        tmp_file = f"{checkpoint_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(checkpoint, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, checkpoint_file)
+    
+    def export_incremental(self, output_dir='exports', fmt='ndjson', compress=False,
+                           checkpoint_file=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """Export only rows added since the last run, resuming an interrupted run
+        
+        The checkpoint keeps a high-water mark (last exported id/created_at). While a
+        run is in progress it also records the delta file, the rows already written
+        and the byte offset they end at, so a crash resumes exactly there.
+        """
+        if fmt not in LINE_EXPORT_FORMATS:
+            raise ValueError(f"Incremental export supports {', '.join(LINE_EXPORT_FORMATS)}, not {fmt}")
         if not self.conn:
             self.connect()
         
+        os.makedirs(output_dir, exist_ok=True)
+        checkpoint_file = checkpoint_file or os.path.join(output_dir, CHECKPOINT_FILENAME)
+        checkpoint = self.load_checkpoint(checkpoint_file)
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM barcodes")
         
-        columns = [description[0] for description in cursor.description]
-        records = []
+        pending = checkpoint.get('pending')
+        if pending:
+            print(f"Resuming export to {pending['file']} after id {pending['last_id']}")
+            fmt = pending['format']
+            # Drop anything written after the last recorded chunk
+            if os.path.exists(pending['file']):
+                with open(pending['file'], 'r+b') as f:
+                    f.truncate(pending['offset'])
+        else:
+            # Fix the upper bound now so rows inserted mid-export go to the next run
+            cursor.execute("SELECT MAX(id) FROM barcodes")
+            target_id = cursor.fetchone()[0] or 0
+            if target_id <= checkpoint['last_id']:
+                print("No new records to export")
+                return 0
+            
+            suffix = '.gz' if compress else ''
+            filename = os.path.join(
+                output_dir,
+                f"barcodes_delta_{checkpoint['last_id'] + 1}_{target_id}.{fmt}{suffix}"
+            )
+            pending = {
+                'file': filename,
+                'format': fmt,
+                'compress': compress,
+                'start_id': checkpoint['last_id'] + 1,
+                'target_id': target_id,
+                'last_id': checkpoint['last_id'],
+                'last_created_at': checkpoint.get('last_created_at'),
+                'rows': 0,
+                'offset': 0,
+            }
+            checkpoint['pending'] = pending
+            self.save_checkpoint(checkpoint_file, checkpoint)
         
-        for row in cursor.fetchall():
-            record = dict(zip(columns, row))
-            records.append(record)
+        opener = gzip.open if pending['compress'] else open
+        while True:
+            cursor.execute("""
+                SELECT * FROM barcodes
+                WHERE id > ? AND id <= ?
+                ORDER BY id
+                LIMIT ?
+            """, (pending['last_id'], pending['target_id'], chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            
+            columns = [description[0] for description in cursor.description]
+            text = encode_rows(columns, rows, fmt)
+            if fmt == 'csv' and pending['offset'] == 0:
+                header = io.StringIO()
+                csv.writer(header).writerow(columns)
+                text = header.getvalue() + text
+            
+            # Each chunk is its own gzip member, so the file is valid after every chunk
+            with opener(pending['file'], 'at', encoding='utf-8', newline='') as f:
+                f.write(text)
+            # The chunk must be on disk before the checkpoint records its offset;
+            # gzip only writes the member trailer on close, so sync after closing
+            with open(pending['file'], 'ab') as f:
+                os.fsync(f.fileno())
+            
+            record = dict(zip(columns, rows[-1]))
+            pending['last_id'] = record['id']
+            pending['last_created_at'] = record.get('created_at')
+            pending['rows'] += len(rows)
+            pending['offset'] = os.path.getsize(pending['file'])
+            self.save_checkpoint(checkpoint_file, checkpoint)
         
-        with open(filename, 'w') as f:
-            json.dump(records, f, indent=2, default=str)
+        exported = pending['rows']
+        checkpoint = {
+            'last_id': pending['target_id'],
+            'last_created_at': pending['last_created_at'],
+            'last_file': pending['file'],
+            'last_rows': exported,
+            'updated_at': datetime.now().isoformat(),
+        }
+        self.save_checkpoint(checkpoint_file, checkpoint)
         
-        print(f"Exported {len(records)} records to {filename}")
-        return len(records)
+        print(f"Exported {exported} new records to {pending['file']}")
+        return exported
     
     def cleanup_old_records(self, days=30):
         """Remove records older than specified days"""
@@ -115,6 +306,8 @@ def main():
         print("  stats - Show database statistics")
         print("  search <query> - Search barcodes")
         print("  export [filename] - Export to JSON")
+        print("  export-stream <filename> [ndjson|csv|json] - Streaming export (.gz to compress)")
+        print("  export-incremental [output_dir] [ndjson|csv] [gzip] - Export rows added since last run")
         print("  cleanup [days] - Clean old records")
         return
     
@@ -145,6 +338,24 @@ def main():
             count = db.export_to_json(filename)
             print(f"Exported {count} records to {filename}")
         
+        elif command == 'export-stream':
+            if len(sys.argv) < 3:
+                print("Please provide an output filename")
+                return
+            filename = sys.argv[2]
+            fmt = sys.argv[3] if len(sys.argv) > 3 else 'ndjson'
+            db.connect()
+            count = db.export_stream(filename, fmt=fmt)
+            print(f"Exported {count} records to {filename}")
+        
+        elif command == 'export-incremental':
+            output_dir = sys.argv[2] if len(sys.argv) > 2 else 'exports'
+            fmt = sys.argv[3] if len(sys.argv) > 3 else 'ndjson'
+            compress = len(sys.argv) > 4 and sys.argv[4] == 'gzip'
+            db.connect()
+            count = db.export_incremental(output_dir, fmt=fmt, compress=compress)
+            print(f"Incremental export wrote {count} records")
+        
         elif command == 'cleanup':
             days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
             db.connect()
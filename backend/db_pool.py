@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Pooled SQLite access for the Flask backend
+One configured connection per thread, re-created after a worker fork
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """Per-thread, per-process pool of WAL-mode SQLite connections"""
+
+    def __init__(self, db_path, busy_timeout=5000, mmap_size=256 * 1024 * 1024,
+                 cache_size_kb=64 * 1024, cached_statements=256):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def _configure(self, conn):
+        """Apply the pragmas every pooled connection shares"""
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        # Negative cache_size is measured in KiB rather than pages
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000.0,
+            cached_statements=self.cached_statements,
+            # Only the owning thread uses it, but stale ones are closed from elsewhere
+            check_same_thread=False,
+        )
+        self._configure(conn)
+        with self._lock:
+            # Drop connections left behind by threads that have exited
+            alive = {thread.ident for thread in threading.enumerate()}
+            for ident in [ident for ident in self._connections if ident not in alive]:
+                self._connections.pop(ident).close()
+            self._connections[threading.get_ident()] = conn
+        return conn
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use"""
+        pid = os.getpid()
+        if pid != self._pid:
+            # Connections must not cross a fork; start over in the child
+            self._local = threading.local()
+            self._connections = {}
+            self._pid = pid
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Yield this thread's connection inside a commit/rollback block"""
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def close_all(self):
+        """Close every connection opened by this process"""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections = {}
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+def create_connection_pool(db_path):
+    """Build a ConnectionPool configured from SQLITE_* environment variables"""
+    return ConnectionPool(
+        db_path,
+        busy_timeout=int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        mmap_size=int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        cache_size_kb=int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+        cached_statements=int(os.environ.get('SQLITE_CACHED_STATEMENTS', 256)),
+    )
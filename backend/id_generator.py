@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Monotonic, time-sortable IDs for barcodes and their image files
+ULID layout: 48-bit millisecond time, 16-bit node id, 64-bit sequence, as 26 Crockford base32 characters
+"""
+
+import hashlib
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+
+CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ID_LENGTH = 26
+NODE_BITS = 16
+SEQUENCE_BITS = 64
+MAX_NODE = (1 << NODE_BITS) - 1
+# A millisecond's sequence starts at a random value below this, leaving 2**63
+# increments before it could run into the next node id
+_SEQUENCE_START_LIMIT = 1 << (SEQUENCE_BITS - 1)
+
+
+def encode_id(value):
+    """128-bit integer -> 26-character Crockford base32 string"""
+    chars = [''] * ID_LENGTH
+    for position in range(ID_LENGTH - 1, -1, -1):
+        chars[position] = CROCKFORD[value & 31]
+        value >>= 5
+    return ''.join(chars)
+
+
+def id_timestamp(value):
+    """Unix time in seconds at which an ID (or a string ending in one) was issued"""
+    milliseconds = 0
+    for char in value[-ID_LENGTH:-ID_LENGTH + 10]:
+        milliseconds = milliseconds * 32 + CROCKFORD.index(char.upper())
+    return milliseconds / 1000
+
+
+def default_node():
+    """Node id from the host and process, for when ID_NODE is not set"""
+    digest = hashlib.blake2b(f'{socket.gethostname()}:{os.getpid()}'.encode(), digest_size=2).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class IdGenerator:
+    """Issue IDs that sort by creation time and never repeat within a process
+
+    IDs from one process strictly increase, even when the clock steps back.
+    Processes are told apart by the node id. Each millisecond's sequence
+    also starts at a random point, so two processes that share a node id
+    are still very unlikely to collide. A forked child picks a new node id
+    unless one was configured.
+    """
+
+    def __init__(self, node=None):
+        if node is not None and not 0 <= node <= MAX_NODE:
+            raise ValueError(f"Node id must be between 0 and {MAX_NODE}")
+        self._configured_node = node
+        self._lock = threading.Lock()
+        self._pid = None
+        self.node = node
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _check_process(self):
+        if self._pid != os.getpid():
+            self.node = default_node() if self._configured_node is None else self._configured_node
+            self._last_ms = -1
+            self._pid = os.getpid()
+
+    def new(self):
+        """Next ID as a 128-bit integer"""
+        with self._lock:
+            self._check_process()
+            now = time.time_ns() // 1_000_000
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = secrets.randbelow(_SEQUENCE_START_LIMIT)
+            else:
+                # Same millisecond, or the clock stepped back: keep counting from the last ID
+                self._sequence += 1
+                if self._sequence >> SEQUENCE_BITS:
+                    self._last_ms += 1
+                    self._sequence = secrets.randbelow(_SEQUENCE_START_LIMIT)
+            return (self._last_ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | self._sequence
+
+    def new_id(self):
+        """Next ID as a 26-character string"""
+        return encode_id(self.new())
+
+
+def create_id_generator():
+    """Build an IdGenerator with the node id from ID_NODE, if set"""
+    node = os.environ.get('ID_NODE')
+    return IdGenerator(int(node) if node else None)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    generator = create_id_generator()
+    start = time.perf_counter()
+    ids = [generator.new_id() for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    assert ids == sorted(ids) and len(set(ids)) == count
+    print(f"{count / elapsed:,.0f} ids/s  node {generator.node}  first {ids[0]}  last {ids[-1]}")
+    print(f"issued at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(id_timestamp(ids[-1])))}")
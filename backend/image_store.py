@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Pluggable storage for generated barcode images, keyed by filename
+'filesystem' keeps one file per image; 'pack' appends to segment files behind an mmap'd hash index
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: pack writers are only serialized within one process
+    fcntl = None
+
+IMAGE_STORES = ('filesystem', 'pack')
+
+StoredImage = namedtuple('StoredImage', 'size mtime etag')
+
+
+def check_key(key):
+    """Keys are bare filenames; anything path-like is rejected"""
+    if not key or key in ('.', '..') or os.path.basename(key) != key or '\\' in key:
+        raise ValueError(f"Invalid image key: {key!r}")
+    return key
+
+
+@lru_cache(maxsize=4096)
+def file_etag(path, mtime_ns, size):
+    """Strong ETag from file content, memoized while the file is unchanged"""
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+class FilesystemStore:
+    """One file per image in a flat directory"""
+
+    name = 'filesystem'
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        """Filesystem path of an image, for send_file and X-Sendfile"""
+        return os.path.join(self.root, check_key(key))
+
+    def put(self, key, data):
+        """Write to a temporary file and rename it, so readers never see a partial image"""
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def put_many(self, items):
+        for key, data in items:
+            self.put(key, data)
+
+    def get(self, key):
+        try:
+            with open(self.path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def stat(self, key):
+        path = self.path(key)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return StoredImage(st.st_size, st.st_mtime, file_etag(path, st.st_mtime_ns, st.st_size))
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stats(self):
+        return {'backend': self.name, 'root': self.root}
+
+
+# index.map: a header, then open-addressing slots probed linearly. Hash 0 marks
+# an empty slot; a deleted key keeps its slot (segment DELETED, offset pointing
+# at the old record) so probe chains stay intact until the next rewrite.
+_INDEX_MAGIC = b'BCIDX001'
+_INDEX_HEADER = struct.Struct('<8sQQQQ')     # magic, slots, used, stale, active segment
+_SLOT = struct.Struct('<QIQIqI')             # key hash, segment, offset, length, mtime_ns, crc32
+_SLOT_BODY = struct.Struct('<IQIqI')         # everything after the hash
+DELETED = 0xFFFFFFFF
+MAX_LOAD = 0.7
+
+# Segment records are self-describing, so the index can be rebuilt from a scan
+_RECORD_MAGIC = b'BCPK'
+_RECORD = struct.Struct('<4sBHIIq')          # magic, flags, key length, data length, crc32, mtime_ns
+_TOMBSTONE = 1
+
+
+def _key_hash(key_bytes):
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), 'little') or 1
+
+
+def _slot_position(slot):
+    return _INDEX_HEADER.size + slot * _SLOT.size
+
+
+def _segment_number(name):
+    """Segment number of a segment-NNNNNN.pack filename, else None"""
+    if name.startswith('segment-') and name.endswith('.pack'):
+        return int(name[len('segment-'):-len('.pack')])
+    return None
+
+
+class PackStore:
+    """Append-only segment files with a memory-mapped hash index
+
+    A lookup hashes the key into the shared index mapping and slices the
+    image out of an mmap'd segment: no per-image open(), stat() or listdir().
+    Writers in every process (gunicorn workers, the batch pool) serialize on
+    an flock while readers never lock; a record is appended before its slot
+    is published. Growing the index, compaction and rebuilds write a new
+    index file, swap it in and flag the old one stale so other processes remap.
+    """
+
+    name = 'pack'
+
+    def __init__(self, root, segment_max_bytes=256 * 1024 * 1024, initial_slots=1 << 14):
+        self.root = root
+        self.segment_max_bytes = segment_max_bytes
+        self.initial_slots = initial_slots
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._pid = None
+        self._lock_file = None
+        self._index = None
+        self._segments = {}      # segment number -> read-only mmap
+        self._appender = None    # (segment number, file opened for append)
+
+    def _index_path(self):
+        return os.path.join(self.root, 'index.map')
+
+    def _segment_path(self, segment):
+        return os.path.join(self.root, f'segment-{segment:06d}.pack')
+
+    # -- process-local handles -------------------------------------------------
+
+    def _check_process(self):
+        """Open per-process handles, again after a fork: flock needs its own open file"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._index, self._segments, self._appender = None, {}, None
+            self._lock_file = open(os.path.join(self.root, 'write.lock'), 'a+b')
+            if not os.path.exists(self._index_path()):
+                with self._flock():
+                    if not os.path.exists(self._index_path()):
+                        self._write_index(self.initial_slots, [], 1)
+            self._pid = os.getpid()
+
+    @contextmanager
+    def _flock(self):
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _write_lock(self):
+        self._check_process()
+        with self._lock, self._flock():
+            self._current_index()
+            yield
+
+    def _current_index(self):
+        """This process's index mapping, remapped once another process has replaced the file"""
+        index = self._index
+        if index is None or _INDEX_HEADER.unpack_from(index, 0)[3]:
+            with self._lock:
+                index = self._index
+                if index is None or _INDEX_HEADER.unpack_from(index, 0)[3]:
+                    with open(self._index_path(), 'r+b') as f:
+                        index = mmap.mmap(f.fileno(), 0)
+                    if _INDEX_HEADER.unpack_from(index, 0)[0] != _INDEX_MAGIC:
+                        raise ValueError(f"{self._index_path()} is not a pack index")
+                    # The old mapping is left to the garbage collector; other threads may still read it
+                    self._index = index
+        return index
+
+    def _segment_view(self, segment, end):
+        """A read-only mapping of segment covering at least end bytes"""
+        view = self._segments.get(segment)
+        if view is None or len(view) < end:
+            with self._lock:
+                view = self._segments.get(segment)
+                if view is None or len(view) < end:
+                    with open(self._segment_path(segment), 'rb') as f:
+                        view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._segments[segment] = view
+        return view
+
+    # -- index probing -----------------------------------------------------------
+
+    def _record_key(self, segment, offset):
+        if segment == DELETED:
+            segment, offset = offset >> 40, offset & ((1 << 40) - 1)
+        view = self._segment_view(segment, offset + _RECORD.size)
+        key_length = _RECORD.unpack_from(view, offset)[2]
+        start = offset + _RECORD.size
+        return self._segment_view(segment, start + key_length)[start:start + key_length]
+
+    def _probe(self, index, key_bytes, key_hash):
+        """(position, slot entry) for key, or (position of the first empty slot, None)"""
+        slots = _INDEX_HEADER.unpack_from(index, 0)[1]
+        slot = key_hash % slots
+        while True:
+            position = _slot_position(slot)
+            entry = _SLOT.unpack_from(index, position)
+            if entry[0] == 0:
+                return position, None
+            if entry[0] == key_hash and self._record_key(entry[1], entry[2]) == key_bytes:
+                return position, entry
+            slot = (slot + 1) % slots
+
+    def _lookup(self, key):
+        """Slot entry for a live key, or None"""
+        key_bytes = check_key(key).encode('utf-8')
+        key_hash = _key_hash(key_bytes)
+        self._check_process()
+        for attempt in range(3):
+            try:
+                _, entry = self._probe(self._current_index(), key_bytes, key_hash)
+                if entry is None or entry[1] == DELETED:
+                    return None
+                _, segment, offset, length, _, crc = entry
+                # Overwrites rewrite a slot in place, so check it against the record it names
+                magic, flags, key_length, data_length, record_crc, _ = _RECORD.unpack_from(
+                    self._segment_view(segment, offset + _RECORD.size), offset)
+                if (magic, flags, key_length, data_length, record_crc) == (
+                        _RECORD_MAGIC, 0, len(key_bytes), length, crc):
+                    return entry
+            except (FileNotFoundError, struct.error):
+                pass  # a compaction removed the segment after the slot was read
+            with self._lock:
+                self._index = None
+        raise RuntimeError(f"Pack index entry for {key!r} does not match its segment")
+
+    # -- public API --------------------------------------------------------------
+
+    def path(self, key):
+        """Packed images have no file of their own"""
+        return None
+
+    def get(self, key):
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        _, segment, offset, length, _, _ = entry
+        start = offset + _RECORD.size + len(key.encode('utf-8'))
+        return self._segment_view(segment, start + length)[start:start + length]
+
+    def stat(self, key):
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        _, _, _, length, mtime_ns, crc = entry
+        # Records are immutable and keep their mtime through compaction
+        return StoredImage(length, mtime_ns / 1e9, f'{mtime_ns:x}-{crc:08x}')
+
+    def exists(self, key):
+        return self._lookup(key) is not None
+
+    def put(self, key, data):
+        self.put_many([(key, data)])
+
+    def put_many(self, items):
+        """Store several images with one lock, one append and one flush"""
+        records = []
+        for key, data in items:
+            key_bytes = check_key(key).encode('utf-8')
+            mtime_ns, crc = time.time_ns(), zlib.crc32(data)
+            header = _RECORD.pack(_RECORD_MAGIC, 0, len(key_bytes), len(data), crc, mtime_ns)
+            records.append((key_bytes, header + key_bytes + data, len(data), mtime_ns, crc))
+        if not records:
+            return
+        with self._write_lock():
+            self._ensure_capacity(len(records))
+            positions = self._append([record for _, record, _, _, _ in records])
+            for (key_bytes, _, length, mtime_ns, crc), (segment, offset) in zip(records, positions):
+                self._publish(key_bytes, segment, offset, length, mtime_ns, crc)
+
+    def delete(self, key):
+        """Append a tombstone and mark the slot deleted; compaction reclaims the space"""
+        key_bytes = check_key(key).encode('utf-8')
+        with self._write_lock():
+            position, entry = self._probe(self._index, key_bytes, _key_hash(key_bytes))
+            if entry is None or entry[1] == DELETED:
+                return False
+            self._append([_RECORD.pack(_RECORD_MAGIC, _TOMBSTONE, len(key_bytes), 0, 0, time.time_ns()) + key_bytes])
+            # Keep a pointer to the old record so the slot's key can still be compared
+            _SLOT_BODY.pack_into(self._index, position + 8, DELETED, (entry[1] << 40) | entry[2], 0, 0, 0)
+            return True
+
+    # -- writer internals (called under _write_lock) -------------------------------
+
+    def _set_header(self, index, **fields):
+        magic, slots, used, stale, active = _INDEX_HEADER.unpack_from(index, 0)
+        values = dict(dict(slots=slots, used=used, stale=stale, active=active), **fields)
+        _INDEX_HEADER.pack_into(index, 0, magic, values['slots'], values['used'],
+                                values['stale'], values['active'])
+
+    def _appender_for(self, segment):
+        if self._appender is None or self._appender[0] != segment:
+            if self._appender is not None:
+                self._appender[1].close()
+            self._appender = (segment, open(self._segment_path(segment), 'ab'))
+        return self._appender[1]
+
+    def _append(self, records):
+        """Append encoded records to the active segment; returns [(segment, offset)]"""
+        segment = _INDEX_HEADER.unpack_from(self._index, 0)[4]
+        size = sum(len(record) for record in records)
+        appender = self._appender_for(segment)
+        # Other processes append too, so the file size is the only reliable offset
+        offset = os.fstat(appender.fileno()).st_size
+        if offset and offset + size > self.segment_max_bytes:
+            segment, offset = segment + 1, 0
+            appender = self._appender_for(segment)
+            self._set_header(self._index, active=segment)
+        positions = []
+        for record in records:
+            positions.append((segment, offset))
+            offset += len(record)
+        appender.write(b''.join(records))
+        appender.flush()
+        return positions
+
+    def _publish(self, key_bytes, segment, offset, length, mtime_ns, crc):
+        """Point key's slot at a record; a new slot's hash goes in last so readers never match a half slot"""
+        key_hash = _key_hash(key_bytes)
+        position, entry = self._probe(self._index, key_bytes, key_hash)
+        _SLOT_BODY.pack_into(self._index, position + 8, segment, offset, length, mtime_ns, crc)
+        if entry is None:
+            struct.pack_into('<Q', self._index, position, key_hash)
+            self._set_header(self._index, used=_INDEX_HEADER.unpack_from(self._index, 0)[2] + 1)
+
+    def _ensure_capacity(self, extra):
+        _, slots, used, _, active = _INDEX_HEADER.unpack_from(self._index, 0)
+        if used + extra > slots * MAX_LOAD:
+            entries = list(self._live_slots())
+            self._replace_index(self._slots_for(len(entries) + extra), entries, active)
+
+    def _slots_for(self, count):
+        slots = self.initial_slots
+        while count > slots * MAX_LOAD / 2:
+            slots *= 2
+        return slots
+
+    def _live_slots(self):
+        slots = _INDEX_HEADER.unpack_from(self._index, 0)[1]
+        for slot in range(slots):
+            entry = _SLOT.unpack_from(self._index, _slot_position(slot))
+            if entry[0] and entry[1] != DELETED:
+                yield entry
+
+    def _write_index(self, slots, entries, active):
+        """Build an index file beside the live one and move it into place"""
+        path = self._index_path() + '.tmp'
+        with open(path, 'wb') as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, slots, len(entries), 0, active))
+            f.truncate(_slot_position(slots))
+        if entries:
+            with open(path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as index:
+                for entry in entries:
+                    slot = entry[0] % slots
+                    while _SLOT.unpack_from(index, _slot_position(slot))[0]:
+                        slot = (slot + 1) % slots
+                    _SLOT.pack_into(index, _slot_position(slot), *entry)
+        os.replace(path, self._index_path())
+
+    def _replace_index(self, slots, entries, active):
+        self._write_index(slots, entries, active)
+        self._set_header(self._index, stale=1)
+        self._index = None
+        self._current_index()
+
+    # -- maintenance -------------------------------------------------------------
+
+    def _segment_numbers(self):
+        return sorted(number for number in map(_segment_number, os.listdir(self.root)) if number is not None)
+
+    def compact(self):
+        """Copy live images into fresh segments, then drop the old ones
+
+        Reclaims the space held by overwritten and deleted images.
+        """
+        with self._write_lock():
+            old_segments = self._segment_numbers()
+            before = sum(os.path.getsize(self._segment_path(number)) for number in old_segments)
+            first = segment = max(old_segments, default=0) + 1
+
+            entries, offset = [], 0
+            out = open(self._segment_path(segment), 'wb')
+            try:
+                # Segment order keeps the copy sequential
+                for _, old_segment, old_offset, length, mtime_ns, crc in sorted(
+                        self._live_slots(), key=lambda entry: entry[1:3]):
+                    view = self._segment_view(old_segment, old_offset + _RECORD.size)
+                    key_length = _RECORD.unpack_from(view, old_offset)[2]
+                    size = _RECORD.size + key_length + length
+                    record = self._segment_view(old_segment, old_offset + size)[old_offset:old_offset + size]
+                    if offset and offset + size > self.segment_max_bytes:
+                        out.close()
+                        segment, offset = segment + 1, 0
+                        out = open(self._segment_path(segment), 'wb')
+                    out.write(record)
+                    key_hash = _key_hash(record[_RECORD.size:_RECORD.size + key_length])
+                    entries.append((key_hash, segment, offset, length, mtime_ns, crc))
+                    offset += size
+            finally:
+                out.close()
+
+            self._replace_index(self._slots_for(len(entries)), entries, segment)
+            self._appender = None
+            for number in old_segments:
+                self._segments.pop(number, None)
+                os.remove(self._segment_path(number))
+            after = sum(os.path.getsize(self._segment_path(number)) for number in range(first, segment + 1))
+            return {'images': len(entries), 'bytes_before': before, 'bytes_after': after}
+
+    def rebuild_index(self):
+        """Recreate a lost or damaged index.map from the segments (run with the app stopped)"""
+        with self._write_lock():
+            latest = {}
+            segments = self._segment_numbers()
+            for segment in segments:
+                size = os.path.getsize(self._segment_path(segment))
+                offset = 0
+                while offset + _RECORD.size <= size:
+                    view = self._segment_view(segment, size)
+                    magic, flags, key_length, length, crc, mtime_ns = _RECORD.unpack_from(view, offset)
+                    end = offset + _RECORD.size + key_length + length
+                    if magic != _RECORD_MAGIC or end > size:
+                        break  # a torn tail from a crash mid-append
+                    key_bytes = bytes(view[offset + _RECORD.size:offset + _RECORD.size + key_length])
+                    if flags & _TOMBSTONE:
+                        latest.pop(key_bytes, None)
+                    else:
+                        latest[key_bytes] = (_key_hash(key_bytes), segment, offset, length, mtime_ns, crc)
+                    offset = end
+            self._replace_index(self._slots_for(len(latest)), list(latest.values()), max(segments, default=1))
+            return len(latest)
+
+    def import_directory(self, directory, chunk=500):
+        """Copy the image files in directory into the pack; returns how many"""
+        names = sorted(name for name in os.listdir(directory)
+                       if not name.startswith('.') and not name.endswith('.tmp')
+                       and os.path.isfile(os.path.join(directory, name)))
+        for start in range(0, len(names), chunk):
+            items = []
+            for name in names[start:start + chunk]:
+                with open(os.path.join(directory, name), 'rb') as f:
+                    items.append((name, f.read()))
+            self.put_many(items)
+        return len(names)
+
+    def stats(self):
+        self._check_process()
+        _, slots, used, _, active = _INDEX_HEADER.unpack_from(self._current_index(), 0)
+        segments = self._segment_numbers()
+        return {
+            'backend': self.name,
+            'root': self.root,
+            'slots': slots,
+            'used_slots': used,
+            'active_segment': active,
+            'segments': len(segments),
+            'segment_bytes': sum(os.path.getsize(self._segment_path(number)) for number in segments),
+        }
+
+
+def create_image_store(barcodes_dir):
+    """Build the store named by IMAGE_STORE (filesystem or pack) for barcodes_dir"""
+    backend = os.environ.get('IMAGE_STORE', 'filesystem').lower()
+    if backend == 'filesystem':
+        return FilesystemStore(barcodes_dir)
+    if backend == 'pack':
+        return PackStore(
+            os.environ.get('IMAGE_PACK_DIR', os.path.join(barcodes_dir, 'packs')),
+            segment_max_bytes=int(os.environ.get('IMAGE_PACK_SEGMENT_MB', 256)) * 1024 * 1024,
+        )
+    raise ValueError(f"IMAGE_STORE must be one of {', '.join(IMAGE_STORES)}")
+
+
+if __name__ == '__main__':
+    # python image_store.py [stats | compact | rebuild | import DIR | bench]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'bench'
+    if command != 'bench':
+        barcodes_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'barcodes')
+        store = PackStore(os.environ.get('IMAGE_PACK_DIR', os.path.join(barcodes_dir, 'packs')))
+        if command == 'import':
+            print(f"imported {store.import_directory(sys.argv[2] if len(sys.argv) > 2 else barcodes_dir)} images")
+        elif command == 'compact':
+            print(store.compact())
+        elif command == 'rebuild':
+            print(f"indexed {store.rebuild_index()} images")
+        print(store.stats())
+        sys.exit(0)
+
+    import random
+    import tempfile
+
+    count = 20000
+    keys = [f'qr_{i:08d}.png' for i in range(count)]
+    payload = os.urandom(900)
+    with tempfile.TemporaryDirectory() as root:
+        for store in (FilesystemStore(os.path.join(root, 'files')), PackStore(os.path.join(root, 'packs'))):
+            start = time.perf_counter()
+            for chunk in range(0, count, 500):
+                store.put_many([(key, payload) for key in keys[chunk:chunk + 500]])
+            written = time.perf_counter() - start
+            sample = random.sample(keys, 5000)
+            start = time.perf_counter()
+            for key in sample:
+                store.stat(key)
+                store.get(key)
+            read = time.perf_counter() - start
+            print(f"{store.name:<10} write {written:5.2f} s for {count}  "
+                  f"stat+get {read / len(sample) * 1e6:6.1f} us per image")
+        print(store.stats())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Persistent background job queue on the barcodes SQLite database
+Jobs survive restarts: a job whose worker died is re-claimed once its lease expires
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from log_config import get_logger
+
+logger = get_logger('jobs')
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+JOBS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        payload TEXT NOT NULL,
+        result TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        progress_done INTEGER NOT NULL DEFAULT 0,
+        progress_total INTEGER,
+        lease_expires REAL,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL
+    )
+'''
+
+
+def ensure_jobs_table(conn):
+    """Create the jobs table and the index the claim query uses"""
+    with conn:
+        conn.execute(JOBS_TABLE_SQL)
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)')
+
+
+class Job:
+    """A claimed job as seen by its handler"""
+
+    def __init__(self, queue, job_id, kind, payload, attempts):
+        self.queue = queue
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+
+    def progress(self, done, total=None):
+        """Record progress and extend the lease; call it between units of work"""
+        self.queue._progress(self.id, done, total)
+
+
+class JobQueue:
+    """SQLite-backed job queue with lease-based claiming and worker threads
+
+    Every process runs its own workers; claiming is a single UPDATE, so
+    several gunicorn workers can share one queue.
+    """
+
+    def __init__(self, pool, workers=1, poll_interval=1.0, lease_seconds=300, max_attempts=3):
+        self.pool = pool
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.handlers = {}
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def register(self, kind, handler):
+        """Run handler(job) for jobs of this kind; its return value is stored as JSON"""
+        self.handlers[kind] = handler
+
+    def submit(self, kind, payload, total=None):
+        """Queue a job and return its id"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self.pool.transaction() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, payload, progress_total, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, kind, json.dumps(payload), total, time.time()))
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Return a job's status as a dict, or None if it does not exist"""
+        row = self.pool.connection().execute('''
+            SELECT id, kind, status, result, error, attempts, progress_done, progress_total,
+                   created_at, started_at, finished_at
+            FROM jobs WHERE id = ?
+        ''', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(('id', 'kind', 'status', 'result', 'error', 'attempts', 'progress_done',
+                        'progress_total', 'created_at', 'started_at', 'finished_at'), row))
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def claim(self):
+        """Atomically take the oldest runnable job, or return None
+
+        Runnable means queued, or running with an expired lease (its worker
+        died or the process restarted).
+        """
+        now = time.time()
+        with self.pool.transaction() as conn:
+            row = conn.execute('''
+                UPDATE jobs
+                SET status = 'running', attempts = attempts + 1,
+                    lease_expires = ?, started_at = COALESCE(started_at, ?)
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)
+                    ORDER BY created_at
+                    LIMIT 1
+                )
+                RETURNING id, kind, payload, attempts
+            ''', (now + self.lease_seconds, now, now)).fetchone()
+        if row is None:
+            return None
+        return Job(self, row[0], row[1], json.loads(row[2]), row[3])
+
+    def _progress(self, job_id, done, total):
+        with self.pool.transaction() as conn:
+            conn.execute('''
+                UPDATE jobs SET progress_done = ?, progress_total = COALESCE(?, progress_total),
+                                lease_expires = ?
+                WHERE id = ? AND status = 'running'
+            ''', (done, total, time.time() + self.lease_seconds, job_id))
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self.pool.transaction() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = ?, result = ?, error = ?, lease_expires = NULL, finished_at = ?
+                WHERE id = ?
+            ''', (status, json.dumps(result) if result is not None else None, error, time.time(), job_id))
+
+    def run_one(self):
+        """Claim and run a single job; returns False when nothing was runnable"""
+        job = self.claim()
+        if job is None:
+            return False
+
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self._finish(job.id, 'failed', error=f"No handler for job kind {job.kind}")
+            return True
+        if job.attempts > self.max_attempts:
+            self._finish(job.id, 'failed', error=f"Gave up after {job.attempts - 1} attempts")
+            return True
+
+        try:
+            result = handler(job)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed: %s", job.id, job.kind, e)
+            self._finish(job.id, 'failed', error=str(e))
+        else:
+            self._finish(job.id, 'done', result=result)
+        return True
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_one():
+                    continue
+            except Exception as e:
+                logger.exception("Job worker error: %s", e)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self):
+        """Start this process's worker threads once (again after a fork)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = pid
+
+    def stop(self, timeout=5.0):
+        """Ask the workers to exit and wait for them"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+
+def create_job_queue(pool):
+    """Build a JobQueue configured from JOB_* environment variables"""
+    return JobQueue(
+        pool,
+        workers=int(os.environ.get('JOB_WORKERS', 1)),
+        poll_interval=int(os.environ.get('JOB_POLL_INTERVAL_MS', 1000)) / 1000.0,
+        lease_seconds=int(os.environ.get('JOB_LEASE_SECONDS', 300)),
+        max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+    )
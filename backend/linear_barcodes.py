@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Native Code128 / EAN-13 / UPC-A / Code39 encoding and NumPy rasterization
+Input is validated and checksummed before anything is drawn
+"""
+
+import os
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import barcode
+from barcode.charsets import code39 as code39_charset
+from barcode.charsets import code128 as code128_charset
+from barcode.charsets import ean as ean_charset
+
+# python-barcode names -> symbology handled here
+SYMBOLOGIES = {
+    'code128': 'code128',
+    'ean13': 'ean13',
+    'ean': 'ean13',
+    'upca': 'upca',
+    'upc': 'upca',
+    'code39': 'code39',
+}
+
+MODULE_WIDTH = 3
+BAR_HEIGHT = 150
+QUIET_ZONE = 10
+FONT_SIZE = 28
+TEXT_GAP = 8
+
+FONT_PATH = os.path.join(os.path.dirname(barcode.__file__), 'fonts', 'DejaVuSansMono.ttf')
+
+_CODE128_START = {'A': 103, 'B': 104, 'C': 105}
+# Switch codes share their value across the sets they are valid in
+_CODE128_SWITCH = {'A': 101, 'B': 100, 'C': 99}
+
+
+def supports(barcode_type):
+    """Return True if barcode_type is rendered natively"""
+    return barcode_type.lower() in SYMBOLOGIES
+
+
+def _code128_value(char, charset):
+    code = ord(char)
+    if charset == 'A':
+        return code - 32 if code >= 32 else code + 64
+    return code - 32
+
+
+def _code128_charset(char):
+    code = ord(char)
+    if code >= 128:
+        raise ValueError(f"Code128 cannot encode {char!r}")
+    return 'A' if code < 32 else 'B'
+
+
+def _digit_run(data, start):
+    end = start
+    while end < len(data) and data[end].isdigit():
+        end += 1
+    return end - start
+
+
+def encode_code128(data):
+    """Code128 symbol values (start, data, checksum) using set C for digit runs"""
+    if not data:
+        raise ValueError("Code128 data must not be empty")
+
+    values = []
+    charset = None
+    i = 0
+    while i < len(data):
+        run = _digit_run(data, i)
+        # Set C pays off for 4+ digits, or a lone even pair/run filling the whole symbol
+        if run >= 4 or (run >= 2 and run % 2 == 0 and run == len(data)):
+            if run % 2:
+                if charset is None:
+                    # At the start, open in C and leave the last digit to the next set
+                    run -= 1
+                else:
+                    # Mid-symbol, the first digit goes in the current A/B set
+                    values.append(_code128_value(data[i], charset))
+                    i += 1
+                    run -= 1
+            if charset != 'C':
+                values.append(_CODE128_START['C'] if charset is None else _CODE128_SWITCH['C'])
+                charset = 'C'
+            for j in range(i, i + run, 2):
+                values.append(int(data[j:j + 2]))
+            i += run
+            continue
+
+        char = data[i]
+        wanted = _code128_charset(char)
+        if charset == 'A' and wanted == 'B' and ord(char) < 96:
+            wanted = 'A'
+        if charset != wanted:
+            values.append(_CODE128_START[wanted] if charset is None else _CODE128_SWITCH[wanted])
+            charset = wanted
+        values.append(_code128_value(char, charset))
+        i += 1
+
+    checksum = (values[0] + sum(position * value for position, value in enumerate(values[1:], 1))) % 103
+    values.append(checksum)
+    return values
+
+
+def _ean_check_digit(digits):
+    """GS1 mod-10 check digit over the digits that precede it"""
+    total = sum(int(digit) * (3 if position % 2 else 1)
+                for position, digit in enumerate(reversed(digits), 1))
+    return str((10 - total % 10) % 10)
+
+
+def _gtin(data, length, name):
+    """Validate a GTIN with or without its check digit and return it complete"""
+    if not data.isdigit() or len(data) not in (length - 1, length):
+        raise ValueError(f"{name} needs {length - 1} or {length} digits")
+    check = _ean_check_digit(data[:length - 1])
+    if len(data) == length and data[-1] != check:
+        raise ValueError(f"{name} check digit should be {check}")
+    return data[:length - 1] + check
+
+
+def _ean13_pattern(ean):
+    parity = ean_charset.LEFT_PATTERN[int(ean[0])]
+    pattern = ean_charset.EDGE
+    pattern += ''.join(ean_charset.CODES[parity[i]][int(digit)] for i, digit in enumerate(ean[1:7]))
+    pattern += ean_charset.MIDDLE
+    pattern += ''.join(ean_charset.CODES['C'][int(digit)] for digit in ean[7:])
+    return pattern + ean_charset.EDGE
+
+
+def encode(data, barcode_type):
+    """Validate data and return (module pattern, human-readable text)
+
+    The pattern is a string of '1' (bar) and '0' (space) modules. Raises
+    ValueError when data cannot be encoded in barcode_type.
+    """
+    symbology = SYMBOLOGIES.get(barcode_type.lower())
+    if symbology == 'code128':
+        values = encode_code128(data)
+        pattern = ''.join(code128_charset.CODES[value] for value in values)
+        return pattern + code128_charset.STOP + '11', data
+    if symbology == 'ean13':
+        ean = _gtin(data, 13, 'EAN-13')
+        return _ean13_pattern(ean), ean
+    if symbology == 'upca':
+        # UPC-A is EAN-13 with a leading zero, which selects all-odd parity
+        upc = _gtin(data, 12, 'UPC-A')
+        return _ean13_pattern('0' + upc), upc
+    if symbology == 'code39':
+        code = data.upper()
+        if not code or any(char not in code39_charset.MAP for char in code):
+            raise ValueError("Code39 accepts 0-9, A-Z, space and - . $ / + %")
+        check = sum(code39_charset.MAP[char][0] for char in code) % 43
+        code += next(char for char, (value, _) in code39_charset.MAP.items() if value == check)
+        chars = [code39_charset.EDGE] + [code39_charset.MAP[char][1] for char in code] + [code39_charset.EDGE]
+        return code39_charset.MIDDLE.join(chars), code
+    raise ValueError(f"{barcode_type} is not rendered natively")
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    try:
+        return ImageFont.truetype(FONT_PATH, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=512)
+def _glyph(char, size):
+    """One monospace character cell as a grayscale array (0 = ink)"""
+    font = _font(size)
+    ascent, descent = font.getmetrics()
+    cell = Image.new('L', (int(font.getlength('M')), ascent + descent), 255)
+    ImageDraw.Draw(cell).text((0, 0), char, fill=0, font=font)
+    return np.asarray(cell)
+
+
+@lru_cache(maxsize=1024)
+def text_strip(text, size=FONT_SIZE):
+    """Render text from cached glyph cells; strips are cached by text too"""
+    strip = np.hstack([_glyph(char, size) for char in text])
+    strip.flags.writeable = False
+    return strip
+
+
+def rasterize(pattern, text=None, module_width=MODULE_WIDTH, bar_height=BAR_HEIGHT,
+              quiet_zone=QUIET_ZONE, font_size=FONT_SIZE):
+    """Draw a module pattern (and optional text line) as a mode 'L' image"""
+    modules = np.frombuffer(pattern.encode('ascii'), dtype=np.uint8) == ord('1')
+    modules = np.pad(modules, quiet_zone, constant_values=False)
+    row = np.where(modules.repeat(module_width), 0, 255).astype(np.uint8)
+    width = row.shape[0]
+
+    strip = text_strip(text, font_size) if text else None
+    height = bar_height + (TEXT_GAP + strip.shape[0] + TEXT_GAP if strip is not None else 0)
+    pixels = np.empty((height, width), dtype=np.uint8)
+    pixels[:bar_height] = row
+    if strip is not None:
+        pixels[bar_height:] = 255
+        strip = strip[:, :width]
+        left = (width - strip.shape[1]) // 2
+        top = bar_height + TEXT_GAP
+        pixels[top:top + strip.shape[0], left:left + strip.shape[1]] = strip
+    return Image.fromarray(pixels, 'L')
+
+
+def render(data, barcode_type, text=True, **layout):
+    """Encode and rasterize in one step; see rasterize() for layout options"""
+    pattern, human_readable = encode(data, barcode_type)
+    return rasterize(pattern, human_readable if text else None, **layout)
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    from barcode.writer import ImageWriter
+
+    samples = [('code128', 'ROB-000123'), ('ean13', '590123412345'), ('upca', '03600029145'), ('code39', 'ROB123')]
+    for barcode_type, data in samples:
+        timings = {}
+        for label, draw in (('ImageWriter', lambda: barcode.get_barcode_class(barcode_type)(data, writer=ImageWriter()).render()),
+                            ('native', lambda: render(data, barcode_type)),
+                            ('native, no text', lambda: render(data, barcode_type, text=False))):
+            draw()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                draw()
+            timings[label] = (time.perf_counter() - start) / repeat * 1000
+        print(f"{barcode_type:<8} " + '  '.join(f"{label} {ms:.3f} ms" for label, ms in timings.items()))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Logging setup for the barcode backend
+Records are queued on the request thread and written by a background listener
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOGGER_NAME = 'robridge'
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'
+
+_listener = None
+
+
+def _start_listener(handlers):
+    """Start a QueueListener draining into handlers and attach its QueueHandler"""
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging():
+    """Configure the 'robridge' logger once per process
+
+    LOG_LEVEL (default INFO) gates records before any message formatting
+    happens; LOG_FORMAT_STRING overrides the line format.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    logger.setLevel(getattr(logging, level, logging.INFO))
+    logger.propagate = False
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(os.environ.get('LOG_FORMAT_STRING', LOG_FORMAT)))
+    _start_listener([handler])
+    atexit.register(_stop_listener)
+
+    # The listener thread does not survive fork (gunicorn --preload, process pools)
+    os.register_at_fork(after_in_child=lambda: _start_listener([handler]))
+    return logger
+
+
+def get_logger(name=None):
+    """Return the package logger or one of its children"""
+    return logging.getLogger(f'{LOGGER_NAME}.{name}' if name else LOGGER_NAME)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Compact QR payload encodings and QR version sizing
+Smaller payloads fit smaller QR versions, which render and scan faster
+"""
+
+import json
+import zlib
+from bisect import bisect_left
+
+import qrcode
+from qrcode import util
+
+# json: the original indented document; compact: short keys, no whitespace, no
+# 'N/A' placeholders; base45: zlib-compressed compact JSON in the QR
+# alphanumeric alphabet (RFC 9285); pointer: only the barcode_id, resolved by
+# the server
+PAYLOAD_MODES = ('json', 'compact', 'base45', 'pointer')
+
+SHORT_KEYS = {
+    'product_name': 'n',
+    'product_id': 'i',
+    'price': 'p',
+    'location': 'l',
+    'category': 'c',
+    'timestamp': 't',
+    'source': 's',
+}
+LONG_KEYS = {short: long for long, short in SHORT_KEYS.items()}
+
+BASE45_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:'
+_BASE45_VALUES = {char: value for value, char in enumerate(BASE45_ALPHABET)}
+
+
+def b45encode(data):
+    """Base45-encode bytes (RFC 9285)"""
+    chars = []
+    for i in range(0, len(data) - 1, 2):
+        value = data[i] * 256 + data[i + 1]
+        value, c = divmod(value, 45)
+        e, d = divmod(value, 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d], BASE45_ALPHABET[e])
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d])
+    return ''.join(chars)
+
+
+def b45decode(text):
+    """Decode Base45 text to bytes, raising ValueError on malformed input"""
+    try:
+        values = [_BASE45_VALUES[char] for char in text]
+    except KeyError:
+        raise ValueError("Invalid Base45 character") from None
+    output = bytearray()
+    for i in range(0, len(values), 3):
+        group = values[i:i + 3]
+        if len(group) == 1:
+            raise ValueError("Invalid Base45 length")
+        value = sum(digit * 45 ** power for power, digit in enumerate(group))
+        if len(group) == 3:
+            if value > 0xFFFF:
+                raise ValueError("Invalid Base45 group")
+            output.extend(divmod(value, 256))
+        else:
+            if value > 0xFF:
+                raise ValueError("Invalid Base45 group")
+            output.append(value)
+    return bytes(output)
+
+
+def compact_fields(fields):
+    """Short keys, placeholder values dropped"""
+    return {SHORT_KEYS.get(key, key): value for key, value in fields.items() if value not in (None, 'N/A')}
+
+
+def encode_fields(fields, mode):
+    """Serialize a payload dict for the json, compact or base45 modes"""
+    if mode == 'json':
+        return json.dumps(fields, indent=2)
+    compact = json.dumps(compact_fields(fields), separators=(',', ':'), ensure_ascii=False)
+    if mode == 'compact':
+        return compact
+    if mode == 'base45':
+        return b45encode(zlib.compress(compact.encode('utf-8'), 9))
+    raise ValueError(f"payload must be one of {', '.join(PAYLOAD_MODES)}")
+
+
+def decode_payload(text):
+    """Inverse of encode_fields for scanners: a long-key dict, or text unchanged
+
+    Pointer payloads and plain barcode data come back as the original string.
+    """
+    try:
+        fields = json.loads(text)
+    except ValueError:
+        try:
+            fields = json.loads(zlib.decompress(b45decode(text)).decode('utf-8'))
+        except (ValueError, zlib.error):
+            return text
+    if not isinstance(fields, dict):
+        return text
+    return {LONG_KEYS.get(key, key): value for key, value in fields.items()}
+
+
+def _data_bits(data):
+    """Bits qrcode.util.QRData.write emits for one segment"""
+    length = len(data)
+    if data.mode == util.MODE_NUMBER:
+        return 10 * (length // 3) + (0, 4, 7)[length % 3]
+    if data.mode == util.MODE_ALPHA_NUM:
+        return 11 * (length // 2) + 6 * (length % 2)
+    return 8 * length
+
+
+def fit_version(qr, start=1):
+    """Smallest version that holds qr's data, without building a bit buffer
+
+    Same result as QRCode.best_fit() but counts bits instead of writing them.
+    """
+    mode_sizes = util.mode_sizes_for_version(start)
+    needed_bits = sum(4 + mode_sizes[data.mode] + _data_bits(data) for data in qr.data_list)
+    version = bisect_left(util.BIT_LIMIT_TABLE[qr.error_correction], needed_bits, start)
+    if version == 41:
+        raise qrcode.exceptions.DataOverflowError()
+    if mode_sizes is not util.mode_sizes_for_version(version):
+        return fit_version(qr, version)
+    return version
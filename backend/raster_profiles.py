@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Named raster encoding profiles for rendered barcode images
+Run directly to measure the size/time trade-off of each profile
+"""
+
+import io
+import sys
+import time
+
+# name -> Pillow format, file extension, mimetype, target mode and save options.
+# Barcode renders are pure black/white (1D text is antialiased gray), so the
+# 'L' and '1' reductions keep every bar and module exactly as drawn.
+RASTER_PROFILES = {
+    # Whatever the renderer produced, Pillow's default PNG settings (previous behaviour)
+    'png': {'format': 'PNG', 'extension': 'png', 'mimetype': 'image/png',
+            'mode': None, 'save': {}},
+    # 1-bit PNG; 1D text glyphs lose their antialiasing
+    'png-1bit': {'format': 'PNG', 'extension': 'png', 'mimetype': 'image/png',
+                 'mode': '1', 'save': {'optimize': True}},
+    # Grayscale PNG at zlib level 9 with Pillow's filter search
+    'png-max': {'format': 'PNG', 'extension': 'png', 'mimetype': 'image/png',
+                'mode': 'L', 'save': {'optimize': True}},
+    # Lossless WebP; method 6 is no smaller than 4 on barcodes but ~100x slower
+    'webp': {'format': 'WEBP', 'extension': 'webp', 'mimetype': 'image/webp',
+             'mode': 'L', 'save': {'lossless': True, 'quality': 100, 'method': 4}},
+}
+
+DEFAULT_PROFILE = 'png'
+
+
+def convert_mode(image, mode):
+    """Reduce image to mode without dithering; '1' images are never widened"""
+    if mode is None or image.mode == mode or image.mode == '1':
+        return image
+    if mode == '1':
+        # Threshold at mid-gray instead of Pillow's default Floyd-Steinberg dither
+        return image.convert('L').point(lambda value: 255 if value >= 128 else 0, mode='1')
+    return image.convert(mode)
+
+
+def encode_image(image, profile=DEFAULT_PROFILE):
+    """Encode a PIL image with a named profile and return the bytes"""
+    settings = RASTER_PROFILES[profile]
+    buffer = io.BytesIO()
+    convert_mode(image, settings['mode']).save(buffer, format=settings['format'], **settings['save'])
+    return buffer.getvalue()
+
+
+def benchmark_profiles(images, repeat=20):
+    """Average encoded size and encode time of each profile over images
+
+    Returns {profile: {'bytes': ..., 'seconds': ...}}.
+    """
+    results = {}
+    for profile in RASTER_PROFILES:
+        total_bytes = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for image in images:
+                total_bytes += len(encode_image(image, profile))
+        elapsed = time.perf_counter() - start
+        count = repeat * len(images)
+        results[profile] = {'bytes': total_bytes / count, 'seconds': elapsed / count}
+    return results
+
+
+def _sample_images():
+    """A metadata-sized QR code and a Code128 label as the renderers draw them"""
+    import json
+    import qrcode
+    import barcode
+    from barcode.writer import ImageWriter
+
+    payload = json.dumps({'barcode_data': 'ROBRIDGE-000123', 'product_name': 'Sample product',
+                          'product_id': 'P-000123', 'price': '9.99', 'location_x': 12.5,
+                          'location_y': 4.0, 'category': 'general'}, indent=2)
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    qr_image = qr.make_image(fill_color="black", back_color="white").get_image()
+    code128_image = barcode.get_barcode_class('code128')('ROBRIDGE-000123', writer=ImageWriter()).render()
+    return {'qr': qr_image, 'code128': code128_image}
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for name, image in _sample_images().items():
+        print(f"{name} ({image.width}x{image.height}, mode {image.mode})")
+        results = benchmark_profiles([image], repeat)
+        baseline = results[DEFAULT_PROFILE]['bytes']
+        for profile, result in results.items():
+            print(f"  {profile:<9} {result['bytes']:>8.0f} bytes "
+                  f"({result['bytes'] / baseline:6.1%})  {result['seconds'] * 1000:7.2f} ms")
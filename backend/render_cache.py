@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Content-addressed render cache for generated barcode images
+Keeps an in-process LRU tier in front of an on-disk tier
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class RenderCache:
+    """Two-tier (memory + disk) cache of rendered image bytes"""
+
+    def __init__(self, cache_dir, max_items=512, max_bytes=32 * 1024 * 1024,
+                 disk_max_bytes=256 * 1024 * 1024, max_age=7 * 24 * 3600,
+                 sweep_interval=256):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._puts_since_sweep = 0
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'disk_evictions': 0,
+        }
+
+    @staticmethod
+    def make_key(barcode_type, data, params=None):
+        """Hash (type, data, render params) into a cache key"""
+        material = json.dumps(
+            [str(barcode_type).lower(), data, params or {}],
+            sort_keys=True, separators=(',', ':'), default=str
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _remember(self, key, value):
+        """Insert into the memory tier and evict least recently used entries"""
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = value
+            self._memory_bytes += len(value)
+            while self._memory and (len(self._memory) > self.max_items or
+                                    self._memory_bytes > self.max_bytes):
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self._counters['evictions'] += 1
+
+    def get(self, key):
+        """Return cached bytes for key, or None"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return value
+
+        path = self._disk_path(key)
+        try:
+            if self.max_age and time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                value = None
+            else:
+                with open(path, 'rb') as f:
+                    value = f.read()
+        except OSError:
+            value = None
+
+        if value is None:
+            with self._lock:
+                self._counters['misses'] += 1
+            return None
+
+        with self._lock:
+            self._counters['disk_hits'] += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store bytes in both tiers"""
+        self._remember(key, value)
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The disk tier is best-effort; the memory tier still holds the entry
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+        with self._lock:
+            self._puts_since_sweep += 1
+            sweep = self._puts_since_sweep >= self.sweep_interval
+            if sweep:
+                self._puts_since_sweep = 0
+        if sweep:
+            self.sweep()
+
+    def get_or_render(self, key, render):
+        """Return cached bytes for key, calling render() on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = render()
+            self.put(key, value)
+        return value
+
+    def sweep(self):
+        """Evict expired disk entries, then the oldest ones until under the size limit"""
+        now = time.time()
+        entries = []
+        total = 0
+        removed = 0
+
+        try:
+            shards = list(os.scandir(self.cache_dir))
+        except OSError:
+            return 0
+
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith('.tmp') or (self.max_age and now - stat.st_mtime > self.max_age):
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if self.disk_max_bytes and total > self.disk_max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.disk_max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    pass
+
+        with self._lock:
+            self._counters['disk_evictions'] += removed
+        return removed
+
+    def clear(self):
+        """Drop the memory tier (disk entries expire through sweep)"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_items'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = (
+            (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        )
+        return stats
+
+
+def create_render_cache(base_dir):
+    """Build a RenderCache configured from RENDER_CACHE_* environment variables"""
+    return RenderCache(
+        cache_dir=os.environ.get('RENDER_CACHE_DIR', os.path.join(base_dir, '.cache')),
+        max_items=int(os.environ.get('RENDER_CACHE_MAX_ITEMS', 512)),
+        max_bytes=int(os.environ.get('RENDER_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+        disk_max_bytes=int(os.environ.get('RENDER_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024)),
+        max_age=int(os.environ.get('RENDER_CACHE_MAX_AGE', 7 * 24 * 3600)),
+    )
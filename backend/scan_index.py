@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+In-memory scan resolution: barcode_id / barcode_data -> row id
+A Bloom filter rejects unknown codes before any lookup; rows are loaded incrementally
+"""
+
+import math
+import os
+import threading
+import time
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, probed by double hashing"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key):
+        # hash() is salted per process, which is fine for a filter that is never persisted;
+        # its two 32-bit halves seed the probe sequence
+        digest = hash(key)
+        first, second = digest & 0xFFFFFFFF, (digest >> 32) | 1
+        bits, size = self._bits, self.size
+        for i in range(self.hashes):
+            position = (first + i * second) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        digest = hash(key)
+        first, second = digest & 0xFFFFFFFF, (digest >> 32) | 1
+        bits, size = self._bits, self.size
+        # Unknown keys usually fail on the first probe or two
+        for i in range(self.hashes):
+            position = (first + i * second) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class ScanIndex:
+    """Resolve scanned codes to barcode row ids without touching SQLite
+
+    Both barcode_id and barcode_data are indexed; when several rows share
+    barcode_data the newest wins. Rows are read incrementally by id, so
+    sync() is cheap after inserts, and resolve() catches up with rows
+    written by other processes when SQLite's data_version moves.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._by_id = {}
+        self._by_data = {}
+        self._last_row_id = 0
+        self._lock = threading.Lock()
+        # The pool hands each thread its own connection, and data_version is per connection
+        self._local = threading.local()
+        self._counters = {'resolved': 0, 'rejected': 0, 'misses': 0, 'syncs': 0, 'rebuilds': 0}
+
+    def _add(self, row_id, barcode_id, barcode_data):
+        self._by_id[barcode_id] = row_id
+        self._by_data[barcode_data] = row_id
+        self._bloom.add(barcode_id)
+        self._bloom.add(barcode_data)
+        if self._bloom.count > self._bloom.capacity:
+            self._rebuild_bloom(self._bloom.capacity * 2)
+
+    def _rebuild_bloom(self, capacity):
+        """Grow the filter before its false-positive rate degrades"""
+        bloom = BloomFilter(capacity, self.error_rate)
+        for key in self._by_id:
+            bloom.add(key)
+        for key in self._by_data:
+            bloom.add(key)
+        self._bloom = bloom
+        self._counters['rebuilds'] += 1
+
+    def sync(self, conn):
+        """Load rows inserted since the last sync; returns how many were added"""
+        with self._lock:
+            rows = conn.execute(
+                'SELECT id, barcode_id, barcode_data FROM barcodes WHERE id > ? ORDER BY id',
+                (self._last_row_id,)
+            ).fetchall()
+            needed = self._bloom.count + 2 * len(rows)
+            if needed > self._bloom.capacity:
+                # Size once for a bulk load rather than doubling repeatedly
+                self._rebuild_bloom(max(needed, self._bloom.capacity * 2))
+            for row_id, barcode_id, barcode_data in rows:
+                self._add(row_id, barcode_id, barcode_data)
+            if rows:
+                self._last_row_id = rows[-1][0]
+            self._counters['syncs'] += 1
+        self._local.data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        return len(rows)
+
+    def _sync_if_changed(self, conn):
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if version != getattr(self._local, 'data_version', None):
+            self.sync(conn)
+
+    def resolve(self, conn, code):
+        """Return (row id, 'barcode_id' | 'barcode_data') for a scanned code, or None"""
+        self._sync_if_changed(conn)
+        if code not in self._bloom:
+            self._counters['rejected'] += 1
+            return None
+        row_id = self._by_id.get(code)
+        if row_id is not None:
+            self._counters['resolved'] += 1
+            return row_id, 'barcode_id'
+        row_id = self._by_data.get(code)
+        if row_id is not None:
+            self._counters['resolved'] += 1
+            return row_id, 'barcode_data'
+        # A Bloom false positive, or a row discarded since it was added
+        self._counters['misses'] += 1
+        return None
+
+    def discard(self, row_id):
+        """Forget a row that no longer exists (deleted behind the index's back)"""
+        with self._lock:
+            for index in (self._by_id, self._by_data):
+                for key in [key for key, value in index.items() if value == row_id]:
+                    del index[key]
+
+    def stats(self):
+        """Index sizes, Bloom filter shape and lookup counters"""
+        return dict(
+            self._counters,
+            barcode_ids=len(self._by_id),
+            barcode_data=len(self._by_data),
+            bloom_bits=self._bloom.size,
+            bloom_hashes=self._bloom.hashes,
+            bloom_capacity=self._bloom.capacity,
+        )
+
+
+def create_scan_index():
+    """Build a ScanIndex sized from SCAN_INDEX_* environment variables"""
+    return ScanIndex(
+        capacity=int(os.environ.get('SCAN_INDEX_CAPACITY', 100000)),
+        error_rate=int(os.environ.get('SCAN_INDEX_ERROR_PPM', 10000)) / 1e6,
+    )
+
+
+if __name__ == '__main__':
+    import sqlite3
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE barcodes (id INTEGER PRIMARY KEY, barcode_id TEXT, barcode_data TEXT)')
+    conn.executemany('INSERT INTO barcodes (barcode_id, barcode_data) VALUES (?, ?)',
+                     ((f'QR_{i:08d}', f'ROB-{i:08d}') for i in range(200000)))
+    index = ScanIndex()
+    start = time.perf_counter()
+    index.sync(conn)
+    print(f"load     {time.perf_counter() - start:.2f} s for 200000 rows  {index.stats()}")
+
+    for label, codes in (('known', [f'ROB-{i:08d}' for i in range(0, 200000, 7)]),
+                         ('unknown', [f'XYZ-{i:08d}' for i in range(30000)])):
+        start = time.perf_counter()
+        for code in codes:
+            index.resolve(conn, code)
+        print(f"{label:<8} {(time.perf_counter() - start) / len(codes) * 1e6:.2f} us per resolve")
+    print(index.stats())
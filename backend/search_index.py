@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+FTS5 full-text index over the barcodes table
+Kept in sync by triggers; shared by the Flask app and database_manager.py
+"""
+
+import re
+
+from log_config import get_logger
+
+logger = get_logger('search')
+
+FTS_TABLE = 'barcodes_fts'
+
+# Column weights for bm25(): product_name, product_id, barcode_id, description
+RANK_WEIGHTS = (10.0, 5.0, 5.0, 1.0)
+
+_DESCRIPTION_SQL = (
+    "CASE WHEN json_valid({row}.metadata) "
+    "THEN json_extract({row}.metadata, '$.description') END"
+)
+
+_TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+_warned_fallback = False
+
+
+def fts5_available(conn):
+    """Return True if this SQLite build has the FTS5 extension"""
+    options = {row[0] for row in conn.execute('PRAGMA compile_options')}
+    return 'ENABLE_FTS5' in options
+
+
+def ensure_search_index(conn):
+    """Create the FTS5 table and its sync triggers, backfilling on first creation
+
+    Returns False when FTS5 is not compiled into SQLite.
+    """
+    if not fts5_available(conn):
+        return False
+
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone()
+
+    with conn:
+        conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                product_name, product_id, barcode_id, description,
+                tokenize = 'unicode61', prefix = '2 3'
+            )
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS barcodes_fts_insert AFTER INSERT ON barcodes BEGIN
+                INSERT INTO {FTS_TABLE} (rowid, product_name, product_id, barcode_id, description)
+                VALUES (new.id, new.product_name, new.product_id, new.barcode_id,
+                        {_DESCRIPTION_SQL.format(row='new')});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS barcodes_fts_delete AFTER DELETE ON barcodes BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS barcodes_fts_update AFTER UPDATE ON barcodes BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+                INSERT INTO {FTS_TABLE} (rowid, product_name, product_id, barcode_id, description)
+                VALUES (new.id, new.product_name, new.product_id, new.barcode_id,
+                        {_DESCRIPTION_SQL.format(row='new')});
+            END
+        ''')
+        if not exists:
+            conn.execute(f'''
+                INSERT INTO {FTS_TABLE} (rowid, product_name, product_id, barcode_id, description)
+                SELECT id, product_name, product_id, barcode_id, {_DESCRIPTION_SQL.format(row='barcodes')}
+                FROM barcodes
+            ''')
+    return True
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 query: every token must match as a prefix"""
+    tokens = _TOKEN_RE.findall(query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_barcodes(conn, query, limit=10):
+    """Ranked prefix search over product name/id, barcode id and description
+
+    Returns (id, barcode_id, product_name, product_id, barcode_type, created_at, rank)
+    rows, best match first. Falls back to LIKE when FTS5 is unavailable.
+    """
+    match = build_match_query(query)
+    if not match:
+        return []
+
+    has_index = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone()
+
+    if has_index:
+        weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+        return conn.execute(f'''
+            SELECT b.id, b.barcode_id, b.product_name, b.product_id, b.barcode_type, b.created_at,
+                   bm25({FTS_TABLE}, {weights}) AS rank
+            FROM {FTS_TABLE}
+            JOIN barcodes b ON b.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ''', (match, limit)).fetchall()
+
+    global _warned_fallback
+    if not _warned_fallback:
+        # Logged once per process: every search is now a full table scan
+        logger.warning("%s is missing (FTS5 unavailable or schema not set up); searching with LIKE", FTS_TABLE)
+        _warned_fallback = True
+    pattern = f'%{query}%'
+    return conn.execute('''
+        SELECT id, barcode_id, product_name, product_id, barcode_type, created_at, NULL
+        FROM barcodes
+        WHERE product_name LIKE ? OR product_id LIKE ? OR barcode_id LIKE ?
+        ORDER BY created_at DESC
+        LIMIT ?
+    ''', (pattern, pattern, pattern, limit)).fetchall()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+R*Tree spatial index over barcode locations (location_x/y/z)
+Kept in sync by triggers; supports bounding-box and k-nearest queries
+"""
+
+import math
+
+from log_config import get_logger
+
+logger = get_logger('spatial')
+
+RTREE_TABLE = 'barcodes_rtree'
+
+# Rows without a z coordinate are indexed on the z = 0 plane
+_Z_SQL = 'COALESCE({row}.location_z, 0)'
+_HAS_LOCATION_SQL = '{row}.location_x IS NOT NULL AND {row}.location_y IS NOT NULL'
+
+INITIAL_RADIUS = 1.0
+MAX_RADIUS = 1e7
+
+_warned_fallback = False
+
+
+def rtree_available(conn):
+    """Return True if this SQLite build has the R*Tree extension"""
+    options = {row[0] for row in conn.execute('PRAGMA compile_options')}
+    return 'ENABLE_RTREE' in options
+
+
+def _insert_sql(row):
+    return f'''
+        INSERT INTO {RTREE_TABLE} (barcode_row, min_x, max_x, min_y, max_y, min_z, max_z)
+        SELECT {row}.id, {row}.location_x, {row}.location_x, {row}.location_y, {row}.location_y,
+               {_Z_SQL.format(row=row)}, {_Z_SQL.format(row=row)}
+        WHERE {_HAS_LOCATION_SQL.format(row=row)};
+    '''
+
+
+def ensure_spatial_index(conn):
+    """Create the R*Tree table and its sync triggers, backfilling on first creation
+
+    Returns False when R*Tree is not compiled into SQLite.
+    """
+    if not rtree_available(conn):
+        return False
+
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (RTREE_TABLE,)
+    ).fetchone()
+
+    with conn:
+        conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(
+                barcode_row, min_x, max_x, min_y, max_y, min_z, max_z
+            )
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS barcodes_rtree_insert AFTER INSERT ON barcodes BEGIN
+                {_insert_sql('new')}
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS barcodes_rtree_delete AFTER DELETE ON barcodes BEGIN
+                DELETE FROM {RTREE_TABLE} WHERE barcode_row = old.id;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS barcodes_rtree_update
+            AFTER UPDATE OF location_x, location_y, location_z ON barcodes BEGIN
+                DELETE FROM {RTREE_TABLE} WHERE barcode_row = old.id;
+                {_insert_sql('new')}
+            END
+        ''')
+        if not exists:
+            conn.execute(f'''
+                INSERT INTO {RTREE_TABLE} (barcode_row, min_x, max_x, min_y, max_y, min_z, max_z)
+                SELECT id, location_x, location_x, location_y, location_y,
+                       {_Z_SQL.format(row='barcodes')}, {_Z_SQL.format(row='barcodes')}
+                FROM barcodes
+                WHERE {_HAS_LOCATION_SQL.format(row='barcodes')}
+            ''')
+    return True
+
+
+def has_spatial_index(conn):
+    """Return True if the R*Tree table exists; warns once per process when it does not"""
+    global _warned_fallback
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (RTREE_TABLE,)
+    ).fetchone()
+    if not exists and not _warned_fallback:
+        logger.warning("%s is missing (R*Tree unavailable or schema not set up); scanning barcodes", RTREE_TABLE)
+        _warned_fallback = True
+    return bool(exists)
+
+
+def _box_query(conn, columns, box, product_id=None, limit=None):
+    """Select columns for barcodes whose point lies inside box, through the R*Tree when it exists"""
+    min_x, max_x, min_y, max_y, min_z, max_z = box
+    if has_spatial_index(conn):
+        sql = f'''
+            SELECT {columns}
+            FROM {RTREE_TABLE} r
+            JOIN barcodes ON barcodes.id = r.barcode_row
+            WHERE r.min_x <= ? AND r.max_x >= ?
+              AND r.min_y <= ? AND r.max_y >= ?
+              AND r.min_z <= ? AND r.max_z >= ?
+        '''
+        params = [max_x, min_x, max_y, min_y, max_z, min_z]
+    else:
+        sql = f'''
+            SELECT {columns}
+            FROM barcodes
+            WHERE {_HAS_LOCATION_SQL.format(row='barcodes')}
+              AND barcodes.location_x BETWEEN ? AND ?
+              AND barcodes.location_y BETWEEN ? AND ?
+              AND {_Z_SQL.format(row='barcodes')} BETWEEN ? AND ?
+        '''
+        params = [min_x, max_x, min_y, max_y, min_z, max_z]
+    if product_id is not None:
+        sql += ' AND barcodes.product_id = ?'
+        params.append(product_id)
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def find_within(conn, columns, min_x, max_x, min_y, max_y,
+                min_z=-math.inf, max_z=math.inf, product_id=None, limit=None):
+    """Rows whose location falls inside an axis-aligned bounding box"""
+    return _box_query(conn, columns, (min_x, max_x, min_y, max_y, min_z, max_z), product_id, limit)
+
+
+def find_nearest(conn, columns, x, y, z=None, k=5, product_id=None,
+                 initial_radius=INITIAL_RADIUS, max_radius=MAX_RADIUS):
+    """The k rows closest to (x, y[, z]) as (row, distance) pairs, nearest first
+
+    Searches a cube that doubles in size until it holds k points within its
+    inscribed sphere, so only the neighbourhood is read from the index. Past
+    max_radius it finishes with one unbounded scan, so distant points are still
+    found when fewer than k lie closer. With z=None the search is planar.
+    """
+    select = f'{columns}, barcodes.location_x, barcodes.location_y, COALESCE(barcodes.location_z, 0)'
+    # Without the index every box is a full scan, so measure every point once instead
+    radius = initial_radius if has_spatial_index(conn) else math.inf
+    while True:
+        if z is None:
+            box = (x - radius, x + radius, y - radius, y + radius, -math.inf, math.inf)
+        else:
+            box = (x - radius, x + radius, y - radius, y + radius, z - radius, z + radius)
+
+        found = []
+        for row in _box_query(conn, select, box, product_id):
+            dx = row[-3] - x
+            dy = row[-2] - y
+            dz = 0.0 if z is None else row[-1] - z
+            found.append((math.sqrt(dx * dx + dy * dy + dz * dz), row[:-3]))
+        found.sort(key=lambda item: item[0])
+
+        # Points inside the box but outside the sphere may not be the true nearest yet
+        within = [item for item in found if item[0] <= radius]
+        if len(within) >= k or radius == math.inf:
+            return [(row, distance) for distance, row in within[:k]]
+        radius = radius * 2 if radius < max_radius else math.inf
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Streaming scan sessions for camera feeds: frame differencing, ROI tracking and
+once-per-pass reporting on top of barcode_decoder; run directly to benchmark
+"""
+
+import struct
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from barcode_decoder import decode_array, decode_region, decode_regions, dedupe_symbols, load_grayscale
+
+# Frames are compared as small thumbnails; averaging down also cancels sensor noise
+DIFF_SIZE = (64, 48)
+# A frame repeats the last decoded one when no thumbnail pixel changed by more
+# than this many gray levels; a small label moving in a large frame still shows
+DIFF_THRESHOLD = 10
+# Decode the whole frame every N decoded frames even while every track still reads
+DISCOVERY_INTERVAL = 10
+# Tracked regions grow by this fraction of their size (plus 16 px) to follow motion
+TRACK_MARGIN = 0.5
+# A symbol that returns after this many frames out of view starts a new pass
+PASS_GAP_FRAMES = 15
+
+# Length-prefixed frame records: 4-byte big-endian size, then an encoded image
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+
+def _key(symbol):
+    return symbol['type'], symbol['data']
+
+
+class ScanSession:
+    """Decode a sequence of frames, reporting each barcode once per pass
+
+    Repeated frames are skipped, barcodes found earlier are re-read from their
+    last known region only, and the whole frame is searched again when a
+    track is lost or every discovery_interval decoded frames.
+    """
+
+    def __init__(self, mode='full', diff_threshold=DIFF_THRESHOLD,
+                 discovery_interval=DISCOVERY_INTERVAL, pass_gap=PASS_GAP_FRAMES):
+        self.mode = mode
+        self.diff_threshold = diff_threshold
+        self.discovery_interval = discovery_interval
+        self.pass_gap = pass_gap
+
+        self.frames = 0
+        self.skipped = 0
+        self.decoded = 0
+        self.discoveries = 0
+        self.emitted = 0
+
+        self._thumbnail = None
+        self._tracks = {}       # (type, data) -> last rect
+        self._last_seen = {}    # (type, data) -> frame number
+        self._passes = {}       # (type, data) -> passes reported
+        self._lost = False
+
+    def _repeats_last(self, gray):
+        thumbnail = cv2.resize(gray, DIFF_SIZE, interpolation=cv2.INTER_AREA)
+        if self._thumbnail is not None and cv2.absdiff(thumbnail, self._thumbnail).max() <= self.diff_threshold:
+            return True
+        # Compare against the last decoded frame, so slow drift still adds up
+        self._thumbnail = thumbnail
+        return False
+
+    def _track_region(self, gray, rect):
+        height, width = gray.shape
+        margin_x = int(rect['width'] * TRACK_MARGIN) + 16
+        margin_y = int(rect['height'] * TRACK_MARGIN) + 16
+        left, top = max(0, rect['left'] - margin_x), max(0, rect['top'] - margin_y)
+        right = min(width, rect['left'] + rect['width'] + margin_x)
+        bottom = min(height, rect['top'] + rect['height'] + margin_y)
+        return left, top, right - left, bottom - top
+
+    def _decode(self, gray):
+        symbols = []
+        for rect in self._tracks.values():
+            symbols += decode_region(gray, self._track_region(gray, rect), scales=(1.0,))
+        found = {_key(symbol) for symbol in symbols}
+        self._lost = any(key not in found for key in self._tracks)
+
+        if self._lost or not self._tracks or self.decoded % self.discovery_interval == 0:
+            self.discoveries += 1
+            symbols += decode_regions(gray) if self.mode == 'regions' else decode_array(gray)
+        return dedupe_symbols(symbols)
+
+    def feed(self, gray):
+        """Process one grayscale frame and return the barcodes that start a new pass"""
+        self.frames += 1
+        if self._repeats_last(gray):
+            self.skipped += 1
+            # Nothing moved, so everything tracked is still in view
+            for key in self._tracks:
+                self._last_seen[key] = self.frames
+            return []
+
+        self.decoded += 1
+        symbols = self._decode(gray)
+        self._tracks = {_key(symbol): symbol['rect'] for symbol in symbols}
+
+        new = []
+        for symbol in symbols:
+            key = _key(symbol)
+            last_seen = self._last_seen.get(key)
+            if last_seen is None or self.frames - last_seen > self.pass_gap:
+                self._passes[key] = self._passes.get(key, 0) + 1
+                new.append(dict(symbol, frame=self.frames, passes=self._passes[key]))
+            self._last_seen[key] = self.frames
+        self.emitted += len(new)
+        return new
+
+    def feed_image(self, image_bytes):
+        """feed() for an encoded frame; a corrupt frame still counts, then raises ValueError"""
+        try:
+            gray = load_grayscale(image_bytes)
+        except ValueError:
+            self.frames += 1
+            raise
+        return self.feed(gray)
+
+    def stats(self):
+        """Frame and decode counters for the session so far"""
+        return {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'decoded': self.decoded,
+            'discoveries': self.discoveries,
+            'emitted': self.emitted,
+            'unique': len(self._passes),
+        }
+
+
+def iter_frames(stream):
+    """Yield encoded frames from a stream of length-prefixed records"""
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) < FRAME_HEADER.size:
+            raise ValueError("Truncated frame header")
+        (size,) = FRAME_HEADER.unpack(header)
+        if size > MAX_FRAME_BYTES:
+            raise ValueError(f"Frame of {size} bytes exceeds {MAX_FRAME_BYTES}")
+        frame = stream.read(size)
+        if len(frame) < size:
+            raise ValueError("Truncated frame")
+        yield frame
+
+
+def pack_frame(image_bytes):
+    """Frame one encoded image for iter_frames"""
+    return FRAME_HEADER.pack(len(image_bytes)) + image_bytes
+
+
+def _conveyor_frames(count=300, width=640, height=480, speed=8, seed=0):
+    """Synthetic conveyor feed: labels crossing the frame with idle gaps between them"""
+    import qrcode
+    from qr_raster import rasterize_qr
+
+    rng = np.random.default_rng(seed)
+    labels = []
+    for index in range(4):
+        qr = qrcode.QRCode(box_size=4, border=2)
+        qr.add_data(f'CONVEYOR-{index:03d}')
+        labels.append(np.asarray(rasterize_qr(qr).convert('L')))
+
+    background = np.full((height, width), 120, dtype=np.uint8)
+    frames = []
+    for number in range(count):
+        frame = background.copy()
+        # One label every 100 frames; each crosses in (width + size) / speed frames
+        label = labels[(number // 100) % len(labels)]
+        x = (number % 100) * speed - label.shape[1]
+        if x < width:
+            left, right = max(0, x), min(width, x + label.shape[1])
+            top = (height - label.shape[0]) // 2
+            frame[top:top + label.shape[0], left:right] = label[:, left - x:right - x]
+        noise = rng.normal(0, 2, frame.shape)
+        frames.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    cv2.setNumThreads(1)
+    frames = _conveyor_frames(count)
+
+    start = time.perf_counter()
+    found = sum(bool(decode_array(frame)) for frame in frames)
+    naive = time.perf_counter() - start
+    print(f"every frame   {count / naive:7.1f} fps  frames with a read: {found}")
+
+    session = ScanSession()
+    start = time.perf_counter()
+    events = [symbol for frame in frames for symbol in session.feed(frame)]
+    elapsed = time.perf_counter() - start
+    print(f"scan session  {count / elapsed:7.1f} fps  events: {[(e['data'], e['frame']) for e in events]}")
+    print(f"              {session.stats()}")
@@ -7,7 +7,7 @@ Shows all data from both barcode generator and other sources
 import sqlite3
 import os
 from datetime import datetime
-import json
+from database_manager import iter_export_chunks
 
 def connect_to_database():
     """Connect to the SQLite database"""
@@ -191,23 +191,14 @@ def export_to_json(conn, filename="database_export.json"):
     print("=" * 50)
     
     cursor.execute("SELECT * FROM barcodes")
-    barcodes = cursor.fetchall()
-    
-    # Get column names
-    cursor.execute("PRAGMA table_info(barcodes)")
-    columns = [col[1] for col in cursor.fetchall()]
-    
-    # Convert to list of dictionaries
-    data = []
-    for barcode in barcodes:
-        barcode_dict = dict(zip(columns, barcode))
-        data.append(barcode_dict)
     
-    # Write to JSON file
+    # Stream rows to disk in chunks instead of building the whole list in memory
+    stats = {}
     with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+        for chunk in iter_export_chunks(cursor, 'json', stats=stats, ensure_ascii=False):
+            f.write(chunk)
     
-    print(f"✅ Exported {len(data)} records to {filename}")
+    print(f"✅ Exported {stats['rows']} records to {filename}")
 
 def main():
     """Main function to display all database information"""
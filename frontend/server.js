@@ -159,6 +159,10 @@ app.post('/api/generate_barcode', async (req, res) => {
   }
 });
 
+// Headers forwarded for /get_barcode caching and range requests
+const IMAGE_REQUEST_HEADERS = ['if-none-match', 'if-modified-since', 'range', 'if-range'];
+const IMAGE_RESPONSE_HEADERS = ['etag', 'last-modified', 'cache-control', 'expires', 'accept-ranges', 'content-range'];
+
 app.get('/api/get_barcode/:filename', async (req, res) => {
   try {
     const isBackendRunning = await checkPythonBackend();
@@ -169,11 +173,22 @@ app.get('/api/get_barcode/:filename', async (req, res) => {
       });
     }
 
-    // Forward request to Python backend
-    const response = await fetch(`http://localhost:5000/get_barcode/${req.params.filename}`);
+    // Forward request to Python backend, passing validators and ranges through
+    const headers = {};
+    IMAGE_REQUEST_HEADERS.forEach((name) => {
+      if (req.headers[name]) headers[name] = req.headers[name];
+    });
+    const response = await fetch(`http://localhost:5000/get_barcode/${req.params.filename}`, { headers });
+    IMAGE_RESPONSE_HEADERS.forEach((name) => {
+      const value = response.headers.get(name);
+      if (value) res.set(name, value);
+    });
     
-    if (response.ok) {
+    if (response.status === 304) {
+      res.status(304).end();
+    } else if (response.ok) {
       const buffer = await response.arrayBuffer();
+      res.status(response.status);
       res.set('Content-Type', response.headers.get('Content-Type'));
       res.send(Buffer.from(buffer));
     } else {